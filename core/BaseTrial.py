@@ -45,7 +45,7 @@ import logging
 from Core import Core
 from movie.moviemaker import MovieMaker
 from buttons.buttons import UserInput
-from events.timer import Timer
+from events.timer import Timer, clock_ns
 from StateMachine import StateMachine
 from stimuli.stimuli import Stimuli
 
@@ -356,8 +356,10 @@ class BaseTrial(StateMachine):
         :return:
         """
         counter = 0
-        init_time = time.time()
+        init_ns = clock_ns()
         while self.status:
+            # Single clock read per loop, shared by state checks
+            now_ns = clock_ns()
 
             if self._running:
                 # Update input devices state
@@ -365,7 +367,7 @@ class BaseTrial(StateMachine):
                 self.go_next()
 
             # Check state status
-            if self.change_state():
+            if self.change_state(now_ns=now_ns):
                 # Send events to devices that will be written into their data file
                 for device in self.devices:
                     if hasattr(self.devices[device], 'send_message'):
@@ -384,7 +386,7 @@ class BaseTrial(StateMachine):
             counter += 1
 
         # Compute average looping time
-        lapses = (time.time() - init_time) / float(counter)
+        lapses = (clock_ns() - init_ns) * 1e-9 / float(counter)
         self.logger.debug('Average lapse for FAST: {} ms'.format(lapses * 1000))
 
     def quit(self):
@@ -399,6 +401,10 @@ class BaseTrial(StateMachine):
         # Shutdown devices
         self.devices.close_all()
 
+        # Write pending design updates and close data file
+        self.trial.save_design()
+        self.trial.close()
+
         self.status = False
 
         # Quit all opened threads
@@ -115,6 +115,11 @@ class Config(object):
                     ],
                     "value": True,
                     "label": "Demo"
+                },
+                "design_flush_interval": {
+                    "type": "text",
+                    "value": 10,
+                    "label": "Design saving interval (# trials)"
                 }
             },
             "display": {
@@ -36,6 +36,7 @@ from os.path import isfile
 
 # Data I/O
 import csv
+from collections import OrderedDict
 
 # Logger
 import logging
@@ -77,6 +78,8 @@ class Design(object):
         self.factors = []
         self.ntrials = None
         self.design = dict()
+        self.pending = OrderedDict()  # Trials not successfully played yet {TrialID: row} (shares rows with self.design)
+        self.__rows = {}  # Every trial indexed by TrialID {TrialID: row} (shares rows with self.design)
         self.method = None
 
         # Initialize design
@@ -129,6 +132,8 @@ class Design(object):
 
         # Randomize trials list
         self.design = self.randomize_list(self.design)
+        self.__rows = dict((str(trial['TrialID']), trial) for trial in self.design)
+        self.pending = OrderedDict((str(trial['TrialID']), trial) for trial in self.design)
 
         # Save design into file
         self.save()
@@ -193,10 +198,13 @@ class Design(object):
         :param data_to_update:
         :return:
         """
-        for trial in self.design:
-            if trial['TrialID'] == str(trial_id):
-                for key, value in data_to_update.iteritems():
-                    trial[key] = value
+        trial = self.__rows.get(str(trial_id))
+        if trial is not None:
+            trial.update(data_to_update)
+
+            # Successfully played trials are removed from the pending list
+            if str(trial['Replay']) == 'False':
+                self.pending.pop(str(trial_id), None)
 
     def get_trial(self, trial_id):
         """
@@ -205,10 +213,7 @@ class Design(object):
         :type trial_id int
         :return trial dict
         """
-        for trial in self.design:
-            if trial['TrialID'] == str(trial_id):
-                return trial
-        return False
+        return self.__rows.get(str(trial_id), False)
 
     def load(self):
         """
@@ -216,10 +221,15 @@ class Design(object):
         """
         try:
             self.design = []
+            self.pending = OrderedDict()
+            self.__rows = {}
             with open(self.userfile, 'r') as csvfile:
                 reader = csv.DictReader(csvfile)
                 for row in reader:
                     self.design.append(row)
+                    self.__rows[row['TrialID']] = row
+                    if row['Replay'] != 'False':
+                        self.pending[row['TrialID']] = row
         except IOError:
             msg = IOError('[{} Could not read "{}"]'.format(__name__, self.userfile))
             logging.getLogger('EasyExp').critical(msg)
@@ -18,7 +18,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from events.timer import Timer
+from events.timer import clock_ns
 import time
 
 # Logger
@@ -61,8 +61,7 @@ class StateMachine(object):
         self.__current = None
         self.__next_state = None
 
-        self.__runtime = Timer()
-        self.__runtime.start()
+        self.__runtime_ns = clock_ns()
 
         self.__counter = 0
         self._syncer = None
@@ -180,7 +179,7 @@ class StateMachine(object):
         self.__current = State(self.state, duration=self.__durations[self.state])
         self.__current.start()
         msg = "[{0}] '{1}' state begins [t={2:1.3f}]".format(__name__, self.state.upper(),
-                                                             self.current.start_time - self.__runtime.get_time('start'))
+                                                             (self.current.start_ns - self.__runtime_ns) * 1e-9)
         self.__logger.info(msg)
 
         self.__move_on_requested = False
@@ -220,9 +219,11 @@ class StateMachine(object):
         """
         return self._syncer.completed(self.state) if self._syncer is not None else True
 
-    def change_state(self):
+    def change_state(self, now_ns=None):
         """
         This function handles transition between states
+        :param now_ns: current time (in ns) as read by the calling loop (optional)
+        :type now_ns: int
         :rtype: bool
         """
         if self.current is None:
@@ -233,7 +234,8 @@ class StateMachine(object):
         # If we transition to the next state
         if self.__is_state_completed() and (
                     (self.durations[self.state] is False and self.__move_on_requested)
-                or (self.durations[self.state] is not False and self.current.status and self.current.running)
+                or (self.durations[self.state] is not False and self.current.running
+                    and self.current.expired(now_ns))
         ):
 
             # Stop current state
@@ -268,7 +270,7 @@ class StateMachine(object):
         :return:
         """
         return "[{0}]: '{1}' state ends [DUR: {3:.3f}s | NEXT: {4}]".format(
-            __name__, self.state.upper(), self.__current.start_time - self.__runtime.get_time('start'),
+            __name__, self.state.upper(), (self.__current.start_ns - self.__runtime_ns) * 1e-9,
             self.current.duration, self.next_state)
 
 
@@ -294,9 +296,9 @@ class State(object):
         self.__name = name  # Name of the state
         self.__status = False  # Status: False if the state has finished
         self.__max_duration = duration  # Maximum duration of the state (can be False (no limit), 0.0, or float > 0.0)
-        self.__timer = None  # State timer
-        self.__start_time = None  # State starting time
-        self.__end_time = None  # State ending time
+        self.__max_duration_ns = None if duration is False else int(duration * 1e9)  # Maximum duration (in ns)
+        self.__start_ns = None  # State starting time (in ns)
+        self.__end_ns = None  # State ending time (in ns)
         self.__duration = 0.0  # State duration
         self.__running = False  # Has the state started already
         self.__executed = False
@@ -328,8 +330,19 @@ class State(object):
         Return status of current state: True if it is time to move on
         :return:
         """
-        if self.__running and self.__max_duration is not False:
-            self.__status = self.__timer.get_time('elapsed') >= self.__max_duration
+        return self.expired()
+
+    def expired(self, now_ns=None):
+        """
+        Has the state reached its maximum duration?
+        :param now_ns: current time in ns (read from the clock if not provided)
+        :type now_ns: int
+        :rtype: bool
+        """
+        if self.__running and self.__max_duration_ns is not None:
+            if now_ns is None:
+                now_ns = clock_ns()
+            self.__status = now_ns - self.__start_ns >= self.__max_duration_ns
         else:
             self.__status = False
         return self.__status
@@ -349,25 +362,29 @@ class State(object):
 
     @property
     def duration(self):
-        self.__duration = self.__timer.get_time('elapsed')
+        end_ns = self.__end_ns if self.__end_ns is not None else clock_ns()
+        self.__duration = (end_ns - self.__start_ns) * 1e-9
         return self.__duration
 
+    @property
+    def start_ns(self):
+        return self.__start_ns
+
     @property
     def start_time(self):
-        return self.__start_time
+        return self.__start_ns * 1e-9 if self.__start_ns is not None else None
 
     @property
     def end_time(self):
-        return self.__end_time
+        return self.__end_ns * 1e-9 if self.__end_ns is not None else None
 
     def start(self):
         """
         Start state
         :return:
         """
-        self.__timer = Timer(max_duration=self.__max_duration)
-        self.__timer.start()
-        self.__start_time = self.__timer.get_time('start')
+        self.__start_ns = clock_ns()
+        self.__end_ns = None
         self.__running = True
 
     def stop(self):
@@ -375,9 +392,7 @@ class State(object):
         End state
         :return:
         """
-        # Stop and reset timer
-        self.__timer.stop()
-        self.__end_time = self.__timer.get_time('stop')
+        self.__end_ns = clock_ns()
         self.__running = False
 
 
@@ -507,16 +522,13 @@ class SingleShot(object):
         :return: boolean
         :rtype: bool
         """
-        if item not in self.__events:
-            try:
-                target(**kwargs)
-                self.__events[item] = False
-                return True
-            except:
-                raise Exception('Could not fire singleshot')
-        else:
+        if item in self.__events:
             return False
 
+        target(**kwargs)
+        self.__events[item] = False
+        return True
+
 
 #######################################
 # Example-related functions and classes
@@ -618,14 +630,16 @@ class TestMachine(StateMachine):
         :return:
         """
         counter = 0
-        init_time = time.time()
+        init_ns = clock_ns()
         while self.status:
+            # Single clock read per loop, shared by state check and time limit
+            now_ns = clock_ns()
 
             if go_next():
                 self.request_move_on()
 
             # Check state status
-            if self.change_state():
+            if self.change_state(now_ns=now_ns):
                 # Send events to devices that will be written into their data file
                 self.logger.debug("Send message to devices: {}".format(self.state))
 
@@ -637,13 +651,13 @@ class TestMachine(StateMachine):
             # Increment loop counter
             counter += 1
 
-            if time.time() - init_time > 5.0:
+            if now_ns - init_ns > 5000000000:
                 self.logger.info('Time is up')
                 self.status = False
                 break
 
         # Compute average looping time
-        lapses = (time.time() - init_time) / float(counter)
+        lapses = (clock_ns() - init_ns) * 1e-9 / float(counter)
         self.logger.debug('Average lapse for FAST: {} ms'.format(lapses * 1000))
 
     def fast_state_machine(self):
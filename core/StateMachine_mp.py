@@ -18,11 +18,35 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from events.timer import Timer
+from events.timer import clock_ns
+import os
 import time
 import numpy as np
 
 
+def set_priority(cpu=None, niceness=-10):
+    """
+    Pin calling process to a CPU and raise its scheduling priority in order to reduce scheduling jitter.
+    Settings that are not supported by the platform or not permitted to the user are silently ignored.
+    :param cpu: index of the CPU the process should run on (None: no pinning)
+    :type cpu: int
+    :param niceness: increment added to the process's niceness (negative values raise priority)
+    :type niceness: int
+    :return: void
+    """
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except (OSError, ValueError):
+            pass
+
+    if hasattr(os, 'nice'):
+        try:
+            os.nice(niceness)
+        except OSError:
+            pass
+
+
 class StateMachine(object):
     """
     State class
@@ -48,8 +72,7 @@ class StateMachine(object):
         self.logger = None
         self.get_logger(queue, configurer)
 
-        self._runtime = Timer()
-        self._runtime.start()
+        self._runtime_ns = clock_ns()
 
     def get_logger(self, queue, configurer):
         """
@@ -104,8 +127,8 @@ class StateMachine(object):
         self._current = State(self.state, duration=self.durations[self.state])
         self._current.start()
         msg = "[{0}] '{1}' state starting [t={2:1.3f}]".format(__name__,
-                                                               self.state.upper(), self.current.start_time
-                                                               - self._runtime.get_time('start'))
+                                                               self.state.upper(),
+                                                               (self.current.start_ns - self._runtime_ns) * 1e-9)
         self.logger.info(msg)
 
     def stop(self):
@@ -118,10 +141,12 @@ class StateMachine(object):
             self.logger.info(self)
             self.state = self.next_state
 
-    def change_state(self, force_move_on=False):
+    def change_state(self, force_move_on=False, now_ns=None):
         """
         This function handles transition between states
         DO NOT MODIFY
+        :param force_move_on: force transition to next state
+        :param now_ns: current time (in ns) as read by the calling loop (optional)
         :rtype: bool
         """
         if self.current is None:
@@ -133,7 +158,7 @@ class StateMachine(object):
         # move_on = force_move_on or (self._current.status and self._current.running)
 
         # If we transition to the next state
-        if force_move_on or (self._current.status and self._current.running):
+        if force_move_on or (self._current.running and self._current.expired(now_ns)):
             self.stop()
             self.start()
             return True
@@ -142,8 +167,8 @@ class StateMachine(object):
 
     def __str__(self):
         return '[{0}]: {1}=>{2} [START: {3:.3f}s | DUR: {4:.3f}s]'.format(__name__, self.state, self.next_state,
-                                                                          self._current.start_time
-                                                                          - self._runtime.get_time('start'),
+                                                                          (self._current.start_ns
+                                                                           - self._runtime_ns) * 1e-9,
                                                                           self.current.duration)
 
 
@@ -169,9 +194,9 @@ class State(object):
         self._name = name  # Name of the state
         self._status = False  # Status: False if the state has finished
         self._max_duration = duration  # Maximum duration of the state (can be False (no limit), 0.0, or float > 0.0)
-        self._timer = None  # State timer
-        self._start_time = None  # State starting time
-        self._end_time = None  # State ending time
+        self._max_duration_ns = None if duration is False else int(duration * 1e9)  # Maximum duration (in ns)
+        self._start_ns = None  # State starting time (in ns)
+        self._end_ns = None  # State ending time (in ns)
         self._duration = 0.0  # State duration
         self._running = False  # Has the state started already
         self.__singleshot = SingleShot()
@@ -186,8 +211,19 @@ class State(object):
         Return status of current state: True if it is time to move on
         :return:
         """
-        if self._running and self._max_duration is not False:
-            self._status = self._timer.get_time('elapsed') >= self._max_duration
+        return self.expired()
+
+    def expired(self, now_ns=None):
+        """
+        Has the state reached its maximum duration?
+        :param now_ns: current time in ns (read from the clock if not provided)
+        :type now_ns: int
+        :rtype: bool
+        """
+        if self._running and self._max_duration_ns is not None:
+            if now_ns is None:
+                now_ns = clock_ns()
+            self._status = now_ns - self._start_ns >= self._max_duration_ns
         else:
             self._status = False
         return self._status
@@ -207,25 +243,29 @@ class State(object):
 
     @property
     def duration(self):
-        self._duration = self._timer.get_time('elapsed')
+        end_ns = self._end_ns if self._end_ns is not None else clock_ns()
+        self._duration = (end_ns - self._start_ns) * 1e-9
         return self._duration
 
+    @property
+    def start_ns(self):
+        return self._start_ns
+
     @property
     def start_time(self):
-        return self._start_time
+        return self._start_ns * 1e-9 if self._start_ns is not None else None
 
     @property
     def end_time(self):
-        return self._end_time
+        return self._end_ns * 1e-9 if self._end_ns is not None else None
 
     def start(self):
         """
         Start state
         :return:
         """
-        self._timer = Timer(max_duration=self._max_duration)
-        self._timer.start()
-        self._start_time = self._timer.get_time('start')
+        self._start_ns = clock_ns()
+        self._end_ns = None
         self._running = True
 
     def stop(self):
@@ -233,9 +273,7 @@ class State(object):
         End state
         :return:
         """
-        # Stop and reset timer
-        self._timer.stop()
-        self._end_time = self._timer.get_time('stop')
+        self._end_ns = clock_ns()
         self._running = False
 
 
@@ -301,16 +339,13 @@ class SingleShot(object):
         :return: boolean
         :rtype: bool
         """
-        if item not in self.__events:
-            try:
-                target(**kwargs)
-                self.__events[item] = False
-                return True
-            except:
-                raise Exception('Could not fire singleshot')
-        else:
+        if item in self.__events:
             return False
 
+        target(**kwargs)
+        self.__events[item] = False
+        return True
+
 
 def go_next():
     """
@@ -340,7 +375,15 @@ import logging
 
 
 class TestMachine(object):
-    def __init__(self, my_logger=None):
+    def __init__(self, my_logger=None, cpus=None):
+        """
+        TestMachine constructor
+        :param my_logger: logger
+        :param cpus: CPUs the graphics and fast loops are pinned to (graphics, fast). Defaults to the two last CPUs if
+         at least 3 are available (first CPU is left to the system), otherwise loops are not pinned
+        :type cpus: tuple
+        """
+        self.cpus = cpus if cpus is not None else self.default_cpus()
         self.threads = None
         self.status = True
         self.timings = {
@@ -353,6 +396,19 @@ class TestMachine(object):
         self.queues = {}
         self.state_machine = None
 
+    @staticmethod
+    def default_cpus():
+        """
+        Choose CPUs the graphics and fast loops are pinned to
+        :return: CPUs indexes (graphics, fast). None if there are not enough CPUs
+        :rtype: tuple
+        """
+        try:
+            nb_cpus = mp.cpu_count()
+        except NotImplementedError:
+            nb_cpus = 1
+        return (nb_cpus - 1, nb_cpus - 2) if nb_cpus > 2 else (None, None)
+
     def listener_process(self, queue, configurer):
         configurer()
         while True:
@@ -408,25 +464,27 @@ class TestMachine(object):
         Graphic state machine loop
         :return:
         """
+        set_priority(cpu=self.cpus[0])
         configurer(queues)
         name = mp.current_process().name
         print('Graphics Worker started: %s' % name)
-        lapses = []
+        lapses_sum = 0.0
+        counter = 0
         logger = logging.getLogger('root')
 
+        now = clock_ns()
         while self.status:
             self.status = queues.get(False)
 
-
-            init_time = time.time()
             # Custom Graphics state
             self.graphics_state_machine(logger)
 
             # Update display
-            stop_time = time.time() - init_time
-            lapses.append(stop_time)
+            last, now = now, clock_ns()
+            lapses_sum += (now - last) * 1e-9
+            counter += 1
 
-        mean_lapse = np.mean(lapses)
+        mean_lapse = lapses_sum / counter if counter > 0 else 0.0
         logger.debug('Average lapse for GRAPHICS: {} ms'.format(mean_lapse * 1000))
         logger.info('Worker finished: {}'.format(name))
 
@@ -435,34 +493,36 @@ class TestMachine(object):
         Fast state machine loop
         :return:
         """
+        set_priority(cpu=self.cpus[1])
         name = mp.current_process().name
         print('Fast Worker started: %s' % name)
         h = l.QueueHandler(queues)  # Just the one handler needed
         logger = logging.getLogger()
         logger.addHandler(h)
         logger.setLevel(logging.DEBUG)  # send all messages, for demo; no other level or filter logic applied.
-        lapses = []
-        start = time.time()
+        lapses_sum = 0.0
+        counter = 0
+        start = now = clock_ns()
         while self.status:
-            init_time = time.time()
-
             # Check state status
-            #if self.state_machine.change_state(force_move_on=go_next()):
+            #if self.state_machine.change_state(force_move_on=go_next(), now_ns=now):
                 # Send events to devices that will be written into their data file
             #    logger.debug("Send message to devices")
 
             # Custom Fast states
             #self.fast_state_machine(logger)
 
-            stop_time = time.time() - init_time
-            lapses.append(stop_time)
+            # Single clock read per loop: used for both the loop lapse and the time limit
+            last, now = now, clock_ns()
+            lapses_sum += (now - last) * 1e-9
+            counter += 1
 
-            if time.time() - start > 5.0:
+            if now - start > 5000000000:
                 logger.info('Time is up')
                 self.status = False
                 break
 
-        mean_lapse = np.mean(lapses)
+        mean_lapse = lapses_sum / counter if counter > 0 else 0.0
         logger.debug('Average lapse for FAST: {} ms'.format(mean_lapse * 1000))
         logger.info('Worker finished: {}'.format(name))
 
@@ -29,11 +29,15 @@ from events.pause import Pause
 from methods.MethodContainer import MethodContainer
 
 # Import useful libraries
-import time
-from os.path import isfile
+import atexit
+import weakref
+from timeit import default_timer
+from os.path import getsize, isfile
 
 # Data I/O
 import csv
+from operator import itemgetter
+from collections import deque
 
 # Logger
 import logging
@@ -50,6 +54,15 @@ class Trial(object):
         - showFeedback(): Display a feedback according to the user's response.
     """
 
+    # Fixed set of attributes (no per-instance __dict__)
+    __slots__ = ('design', 'settings', 'userfile', '__logger', 'id', 'nreplay', 'nplayed', 'data', 'replayed',
+                 'status', 'played', 'parameters', '__playlist', '__replay_list', '__fieldnames', '__empty_row',
+                 '__get_row', '__datafile', '__writer', '__data_offset', 'init_time', 'end_time', 'pauseInt',
+                 'pause_time', 'nbPause', 'pause_duration', 'pause', '__random_design', 'save_interval', '__unsaved',
+                 'conditions', 'ntrials', 'method', '__weakref__')
+
+    __current = None  # Weak reference to the latest trial (only this one is flushed at exit, see flush_current())
+
     def __init__(self, design=Design, settings=None, userfile='', pause_interval=0):
         """
         Constructor of Trial class
@@ -78,9 +91,14 @@ class Trial(object):
         # Lists
         self.played = []  # List of played trials
         self.parameters = {}  # Trial's conditions
-        self.__playlist = []  # List of trials to play
-        self.__replay_list = []  # List of trials to replay
-        self.__default_fields = {}
+        self.__playlist = deque()  # Queue of trials to play
+        self.__replay_list = deque()  # Queue of trials to replay
+        self.__fieldnames = None  # Data file's header (fixed once the file has been created)
+        self.__empty_row = {}  # Row with every header's field set to an empty value
+        self.__get_row = None  # Extracts header's fields from a row, in header's order
+        self.__datafile = None  # Data file handle (kept open for the whole session)
+        self.__writer = None  # Data file writer
+        self.__data_offset = 0  # Position in data file up to which rows have been loaded into self.data
 
         # Timers
         self.init_time = 0
@@ -97,6 +115,11 @@ class Trial(object):
         # Load Trials list
         self.__random_design = None
 
+        # Design file is only written every `save_interval` trial updates (and on pause/exit)
+        self.save_interval = max(1, int(self.settings['setup']['design_flush_interval']))
+        self.__unsaved = 0  # Number of design updates not written to the design file yet
+        Trial.__current = weakref.ref(self)
+
         # Load conditions
         self.conditions = design.allconditions
         self.ntrials = design.ntrials  # Total number of trials to play
@@ -126,21 +149,26 @@ class Trial(object):
         :rtype: bool
         """
         if self.pause.run(force=force):
-            self.__logger.info('[{0}] {1}'.format(__name__, self.pause.text))
+            self.__logger.info('[%s] %s', __name__, self.pause.text)
+            self.save_design()
             return True
         else:
             return False
 
     def __load_design(self):
         """
-        Loads and randomizes trials list
-        :return void:
+        Loads trials list
+        Design file is only read once: design is then updated in memory by this class (see __valid() and __replay())
+        :return: True if trials list has just been loaded
+        :rtype: bool
         """
-        self.__random_design = None
-        self.design.load()
+        if self.__random_design is not None:
+            return False
 
-        # Remove played trials from trials list
-        self.__random_design = Trial.filter_design(self.design.design)
+        # Played trials are already removed from trials list by Design.load()
+        self.design.load()
+        self.__random_design = self.design.pending
+        return True
 
     def setup(self):
         """
@@ -149,9 +177,14 @@ class Trial(object):
         """
         self.replayed = True
 
-        # Get trial to play
-        self.__load_design()
-        self.id = self.get_trial_id()
+        # Get trial to play (queues are only built once, then kept up to date by __valid() and __replay())
+        if self.__load_design():
+            self.id = self.get_trial_id()
+        else:
+            # Replayed trials are only played once all the other trials have been played
+            if not self.__playlist:
+                self.__playlist = self.__replay_list
+            self.id = self.__playlist[0] if self.__playlist else False
         self.status = self.id is not False
 
         if self.run_pause():
@@ -163,6 +196,7 @@ class Trial(object):
                 self.status = True
             else:
                 self.__logger.info('\n[{}] The experiment is over!'.format(__name__))
+                self.save_design()
                 self.status = False
         return self.status
 
@@ -172,24 +206,18 @@ class Trial(object):
         :return: int or boolean
         """
         self.get_playlist()
-        self.load_data()
 
-        if len(self.__playlist) > 0:
-            self.id = self.__playlist[0]
-        else:
-            self.id = False
+        self.id = self.__playlist[0] if self.__playlist else False
         return self.id
 
-    @staticmethod
-    def filter_design(design):
+    def filter_design(self):
         """
-        This function removes successfully played trials from the trials list
-        :param list design: trials list
-        :type design: list(dict)
-        :return:
+        Get trials that still have to be played (successfully played trials are removed from the pending trials kept
+        by Design)
+        :return: trials that still have to be played
+        :rtype: list(dict)
         """
-        filtered_design = [design[ii] for ii in range(len(design)) if design[ii]['Replay'] != 'False']
-        return filtered_design
+        return self.design.pending.values()
 
     def get_playlist(self):
         """
@@ -197,17 +225,20 @@ class Trial(object):
         :return:
         """
         self.played = []
-        self.__playlist = []
-        self.__replay_list = []
-        for trial in self.__random_design:
-            if trial['Replay'] == 'True':
-                self.__playlist.append(int(trial['TrialID']))
-            elif trial['Replay'] == 'replay':
-                self.__replay_list.append(int(trial['TrialID']))
+        playlist = deque()
+        replay_list = deque()
+        for trial in self.__random_design.itervalues():
+            replay = trial['Replay']
+            if replay == 'True':
+                playlist.append(int(trial['TrialID']))
+            elif replay == 'replay':
+                replay_list.append(int(trial['TrialID']))
 
         self.nplayed = self.design.ntrials - len(self.__random_design)
-        if len(self.__playlist) == 0 and len(self.__replay_list) > 0:
-            self.__playlist = self.__replay_list
+
+        # Replayed trials are only played once all the other trials have been played
+        self.__replay_list = replay_list
+        self.__playlist = playlist if playlist else replay_list
 
     def parse(self, params):
         """
@@ -215,18 +246,15 @@ class Trial(object):
         :param params:
         :return:
         """
-        i = 0
-        self.parameters = {}
-        for condition in self.design.conditions:
-            self.parameters[condition] = params[i]
-            i += 1
+        self.parameters = dict(zip(self.design.conditions, params))
 
     def start(self):
         """
         Start the trial and the timer
         :return:
         """
-        self.init_time = time.time()
+        self.init_time = default_timer()
+        # Trial information is only converted to string if the record is actually emitted
         self.__logger.info(self)
 
     def __valid(self):
@@ -236,7 +264,12 @@ class Trial(object):
         """
         self.replayed = False
         self.design.update(self.id, {'Replay': False})
-        self.design.save(True)
+        self.nplayed = self.design.ntrials - len(self.__random_design)
+        self.__request_save()
+
+        # Trial has been played: remove it from the queue
+        if self.__playlist and self.__playlist[0] == self.id:
+            self.__playlist.popleft()
 
     def stop(self, status):
         """
@@ -247,8 +280,8 @@ class Trial(object):
             self.__replay()
         else:
             self.__valid()
-        self.end_time = time.time() - self.init_time
-        self.__logger.info("[{0}] Trial {1}: END (duration: {2:.2f})".format(__name__, self.id, self.end_time))
+        self.end_time = default_timer() - self.init_time
+        self.__logger.info("[%s] Trial %s: END (duration: %.2f)", __name__, self.id, self.end_time)
 
     def __replay(self):
         """
@@ -256,32 +289,87 @@ class Trial(object):
         of the file
         :return: bool
         """
-        self.__logger.info('[{}] Trial {} => INVALID!'.format(__name__, self.id))
+        self.__logger.info('[%s] Trial %s => INVALID!', __name__, self.id)
         self.nreplay += 1
         self.replayed = 'replay'
         self.design.update(self.id, {'Replay': 'replay'})
-        self.design.save(True)
+        self.__request_save()
+
+        # Trial is moved to the end of the replay queue
+        if self.__playlist and self.__playlist[0] == self.id:
+            self.__replay_list.append(self.__playlist.popleft())
+
+    def __request_save(self):
+        """
+        Count design update and write design file if too many updates are pending
+        :return:
+        """
+        self.__unsaved += 1
+        if self.__unsaved >= self.save_interval:
+            self.save_design()
+
+    @classmethod
+    def flush_current(cls):
+        """
+        Write pending design updates of the latest trial and close its data file (called at exit)
+        :return:
+        """
+        trial = cls.__current() if cls.__current is not None else None
+        if trial is not None:
+            trial.save_design()
+            trial.close()
+
+    def save_design(self):
+        """
+        Write pending design updates into the design file
+        :return:
+        """
+        if self.__unsaved > 0:
+            self.design.save(True)
+            self.__unsaved = 0
 
     def openfile(self):
         """
         Create user's data file and write header's fields:
          Basic fields: TrialID, replayed, conditions (Provided by defaultfieldsname),
             measures (keep the conditions' order for convenience)
+        The data file is then kept open for appending until Trial.close() is called.
         """
         if not isfile(self.userfile):
+            self.close()
             try:
                 with open(self.userfile, 'w', 0) as csvfile:
-                    writer = csv.DictWriter(csvfile, fieldnames=self.__default_fields)
-                    writer.writeheader()
+                    writer = csv.writer(csvfile)
+                    writer.writerow(self.__fieldnames)
             except (IOError, TypeError) as e:
                 msg = IOError("[{}] Could not write into the user's datafile '{}': {}".format(
                     __name__, self.userfile, e))
                 self.__logger.critical(msg)
                 raise msg
 
+        if self.__datafile is None:
+            try:
+                self.__datafile = open(self.userfile, 'a')
+                self.__writer = csv.writer(self.__datafile)
+            except IOError as e:
+                msg = IOError("[{}] Could not open the user's datafile '{}': {}".format(__name__, self.userfile, e))
+                self.__logger.critical(msg)
+                raise msg
+
+    def close(self):
+        """
+        Close user's data file
+        """
+        if self.__datafile is not None:
+            self.__datafile.close()
+            self.__datafile = None
+            self.__writer = None
+
     def write_data(self, datatowrite=None):
         """
         Write user's data to the data file (may be call at the end of each trial)
+        Rows are appended as CSV to the data file kept open by openfile(): this file is read back by experiment methods
+        (see MethodBase._load_data()) and analysis scripts, so its format must remain CSV.
         :param datatowrite: list of data to write.
         :type datatowrite: None|dict
         """
@@ -289,33 +377,92 @@ class Trial(object):
         data.update(self.parameters)
         if datatowrite is not None:
             data.update(datatowrite)
-        self.__default_fields = data.keys()
 
-        if not isfile(self.userfile):
-            self.__logger.warning('[{}] User Data filename does not exist yet. We start from scratch!'.format(__name__))
+        # Data file only has to be checked/created the first time (it is then kept open)
+        if self.__writer is None:
+            if not isfile(self.userfile):
+                self.__logger.warning('[{}] User Data filename does not exist yet. We start from scratch!'.format(
+                    __name__))
+                self.__set_fieldnames(self.__make_fieldnames(data))
+            elif self.__fieldnames is None:
+                # Get header from existing data file
+                self.load_data()
             self.openfile()
+
+        row = dict(self.__empty_row)
+        row.update(data)
+        if len(row) != len(self.__fieldnames):
+            msg = ValueError('[{}] Fields not found in the data file header: {}'.format(
+                __name__, ', '.join(str(field) for field in data if field not in self.__empty_row)))
+            self.__logger.critical(msg)
+            raise msg
+
         try:
-            with open(self.userfile, 'a') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=self.__default_fields)
-                writer.writerow(data)
+            self.__writer.writerow(self.__get_row(row))
+            # Data file is read back by experiment methods (e.g. staircases) before next trial
+            self.__datafile.flush()
         except (IOError, TypeError) as e:
             msg = IOError('[{}] User Data filename could not be read: {}'.format(__name__, e))
             self.__logger.critical(msg)
             raise msg
 
+    def __make_fieldnames(self, data):
+        """
+        Make data file's header: trial information and conditions first (same order as in the design file), followed
+        by measures in alphabetical order
+        :param data: first row of data
+        :type data: dict
+        :rtype: tuple
+        """
+        headers = self.design.headers if self.design.headers is not None else ('TrialID', 'Replay')
+        first = [field for field in headers if field in data]
+        return tuple(first) + tuple(sorted(field for field in data if field not in first))
+
+    def __set_fieldnames(self, fieldnames):
+        """
+        Set data file's header
+        :param fieldnames: ordered fields name
+        :type fieldnames: list|tuple
+        """
+        self.__fieldnames = tuple(fieldnames)
+        self.__empty_row = dict.fromkeys(self.__fieldnames, '')
+        self.__get_row = itemgetter(*self.__fieldnames)
+
     def load_data(self):
         """
         Load data from file
+        Rows are only appended to the data file, so only the rows added since last call are parsed. Trials list is
+        built from the design file, so this is only needed when rows are actually requested (or to get the header).
         :return:
         """
-        data = []
         try:
-            with open(self.userfile) as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    data.append(row)
-        except (IOError, TypeError):
+            if getsize(self.userfile) < self.__data_offset:
+                # Data file has been re-created: read it from the beginning
+                self.__data_offset = 0
+
+            with open(self.userfile, 'rb') as csvfile:
+                csvfile.seek(self.__data_offset)
+                chunk = csvfile.read()
+        except (IOError, OSError, TypeError):
             self.__logger.warning('[{}] User Data filename does not exist yet'.format(__name__))
-
-        self.data = data
-        return data
+            self.__data_offset = 0
+            self.data = []
+            return self.data
+
+        # Only parse complete lines
+        chunk = chunk[:chunk.rfind('\n') + 1]
+        reader = csv.reader(chunk.splitlines(True))
+        if self.__data_offset == 0:
+            self.data = []
+            header = next(reader, None)
+            if header is not None:
+                self.__set_fieldnames(header)
+        self.__data_offset += len(chunk)
+
+        if self.__fieldnames is not None:
+            self.data.extend(dict(zip(self.__fieldnames, row)) for row in reader)
+        return self.data
+
+
+# Pending design updates of the latest trial are written at exit
+atexit.register(Trial.flush_current)
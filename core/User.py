@@ -22,7 +22,7 @@ from __future__ import print_function
 import json
 import time
 from os import mkdir, remove
-from os.path import isdir, isfile, join
+from os.path import abspath, getmtime, isdir, isfile, join
 
 # GUI
 from gui.gui_wrapper import GuiWrapper
@@ -47,6 +47,14 @@ class User(object):
     - file I/O methods (load, save)
     """
 
+    # Fixed set of attributes (no per-instance __dict__)
+    __slots__ = ('practice', 'expname', 'demo', 'session', '__logger', 'age', 'hand', 'eye', 'dEye', 'exist', 'date',
+                 'name', 'gender', 'starttime', 'datafolder', 'base_file_name', 'subfolder', 'infofile', 'designfile',
+                 'datafilename', 'logfilename', 'defaultfieldsname', 'dftName', '__info', '__info_mtime')
+
+    # Info fields that can be set as attributes (other fields found in the info file are only kept in self.__info)
+    __info_fields = frozenset(slot for slot in __slots__ if not slot.startswith('__'))
+
     def __init__(self, data_folder, expname, session=1, demo=False, practice=False):
         """
         Constructor of User class
@@ -91,6 +99,8 @@ class User(object):
         self.logfilename = None  # Log file
         self.defaultfieldsname = None  # default fields name
         self.dftName = None  # subject default file name
+        self.__info = None  # Content of info file
+        self.__info_mtime = None  # Modification time of info file when it was last read/written
 
     def __str__(self):
         """
@@ -116,8 +126,8 @@ class User(object):
         if self.demo is False:
             self.name = self.get_user_name(cli)
 
-        # Set folders and files
-        self.subfolder = join(self.datafolder, self.name)
+        # Set folders and files (resolved once, so that files are still found if the working directory changes)
+        self.subfolder = abspath(join(self.datafolder, self.name))
         self.infofile = join(self.subfolder, "{}_info.txt".format(self.name))
         self.dftName = join(self.subfolder, '{}_{}_{}'.format(self.name, self.expname, self.session))
         self.base_file_name = '{}_{}'.format(self.expname, self.session)
@@ -211,20 +221,28 @@ class User(object):
 
         datatowrite = {}
         for key, value in info.out.iteritems():
-            setattr(self, key, value)
+            if key in User.__info_fields:
+                setattr(self, key, value)
             datatowrite[key] = value
 
-        # We write subject's info in a file
-        with open(self.infofile, 'w', 0) as fid:
-            json.dump(datatowrite, fid, indent=4)
+        # We write subject's info in a file (compact JSON: smaller and faster to parse, still human-readable)
+        with open(self.infofile, 'wb') as fid:
+            fid.write(json.dumps(datatowrite, separators=(',', ':')).encode('utf-8'))
+        self.__info = datatowrite
+        self.__info_mtime = getmtime(self.infofile)
 
     def loadinfo(self):
         """
         Loading user information from user's info file
         :rtype : object: instance of User
         """
-        json_info = open(self.infofile, 'r')
-        subinfo = json.load(json_info)
-        for key, value in subinfo.iteritems():
-            setattr(self, key, subinfo[key])
-        json_info.close()
+        # Only read info file if it has been modified since last time
+        mtime = getmtime(self.infofile)
+        if self.__info is None or mtime != self.__info_mtime:
+            with open(self.infofile, 'rb') as json_info:
+                self.__info = json.loads(json_info.read())
+            self.__info_mtime = mtime
+
+        for key, value in self.__info.items():
+            if key in User.__info_fields:
+                setattr(self, key, value)
@@ -27,7 +27,6 @@ import sys
 import os
 from psychopy import visual, event, sound, __version__ as psychopy_ver
 import numpy as np
-import array
 
 from PIL import Image
 
@@ -44,6 +43,42 @@ WHITE = (255, 255, 255)
 GRAY = GREY = (128, 128, 128)
 BLACK = (0, 0, 0)
 buttons = (0, 0)
+
+# Mapping between psychopy's key names and Eyelink's key codes
+KEY_MAPPING = {
+    'f1': pylink.F1_KEY,
+    'f2': pylink.F2_KEY,
+    'f3': pylink.F3_KEY,
+    'f4': pylink.F4_KEY,
+    'f5': pylink.F5_KEY,
+    'f6': pylink.F6_KEY,
+    'f7': pylink.F7_KEY,
+    'f8': pylink.F8_KEY,
+    'f9': pylink.F9_KEY,
+    'f10': pylink.F10_KEY,
+    'pageup': pylink.PAGE_UP,
+    'pagedown': pylink.PAGE_DOWN,
+    'up': pylink.CURS_UP,
+    'down': pylink.CURS_DOWN,
+    'left': pylink.CURS_LEFT,
+    'right': pylink.CURS_RIGHT,
+    'backspace': '\b',
+    'return': pylink.ENTER_KEY,
+    'escape': pylink.ESC_KEY,
+    'tab': '\t',
+    'c': pygame.K_c,
+    'v': pygame.K_v
+}
+
+# Colors of camera image's crosshair elements (RGBA)
+CROSSHAIR_COLORS = {
+    pylink.CR_HAIR_COLOR: (255, 255, 255, 255),
+    pylink.PUPIL_HAIR_COLOR: (255, 255, 255, 255),
+    pylink.PUPIL_BOX_COLOR: (0, 255, 0, 255),
+    pylink.SEARCH_LIMIT_BOX_COLOR: (255, 0, 0, 255),
+    pylink.MOUSE_CURSOR_COLOR: (255, 0, 0, 255)
+}
+
 spath = os.path.dirname(sys.argv[0])
 if len(spath) != 0:
     os.chdir(spath)
@@ -114,22 +149,41 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
 
         # Eye Image properties
         # ================
-        self.imgBuffInitType = 'l'
-        self.imagebuffer = array.array(self.imgBuffInitType)
+        self.imagebuffer = None  # Camera image (one 32-bit RGBX pixel per camera pixel)
+        self.rawbuffer = None  # Camera image (palette indices)
+        self.img_stim = None  # Camera image stimulus (created once, then only its image is updated)
         # scaling of the camera image, must be an integer, i.e., 1,2,3
         self.sf = 2
 
-        self.tmp_file = "{}/dump_img.jpg".format(__FOLDER__)
-
         self.pal = None
         self.size = (384, 320)
+        self.img_size = (self.size[0] * self.sf, self.size[1] * self.sf)  # Displayed size of the camera image
+        self.title_pos = (0, 0 - self.size[0] * self.sf / 2.0 - 20)  # Position of the camera image title
 
         # image title
         self.title = visual.TextStim(self.ptw, '', height=self.size[1]*self.sf/20)
 
+        # Calibration menu (one line per message)
+        msgs = ("Eyelink calibration menu", "Press C to calibrate", "Press V to validate", "Press A to auto-threshold",
+                "Press I to toggle extra info in camera image", "Press Enter to show camera image",
+                "Press ESC to abort calibration", "Press Q to exit menu")
+        self.menu = [visual.TextStim(self.ptw, text=msg, pos=(0, .9 - .1 * i), units='norm', color=(1, 1, 1))
+                     for i, msg in enumerate(msgs)]
+
         # lines
         self.line = visual.Line(self.ptw, start=(0, 0), end=(0, 0), lineWidth=1.0, lineColor=[0, 0, 0])
 
+        # Calibration targets, fixation point and gaze position (only their position changes)
+        self.outer_target = visual.PatchStim(self.ptw, tex=None, mask='circle', units=self.units,
+                                             size=self.targetsize_out, color=self.outer_tgcol)
+        self.inner_target = visual.PatchStim(self.ptw, tex=None, mask='circle', units=self.units,
+                                             size=self.targetsize_in, color=self.inner_tgcol)
+        self.outer_fixation = visual.Circle(self.ptw, units=self.units, radius=self.targetsize_out, fillColor=None,
+                                            lineColor=self.outer_tgcol)
+        self.inner_fixation = visual.Circle(self.ptw, units=self.units, radius=self.targetsize_in,
+                                            fillColor=self.inner_tgcol, lineColor=self.inner_tgcol)
+        self.eye = visual.PatchStim(self.ptw, tex=None, mask='circle', units=self.units, size=(20, 20), color='red')
+
         # check psychopy version
         self.psychopyVer = psychopy_ver
 
@@ -164,14 +218,8 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
         """
         Draws the menu screen.
         """
-        msgs = ("Eyelink calibration menu", "Press C to calibrate", "Press V to validate", "Press A to auto-threshold",
-                "Press I to toggle extra info in camera image", "Press Enter to show camera image", "Press ESC to abort calibration", "Press Q to exit menu");
-        pos = .9
-        for msg in msgs:
-            print(msg)
-            text = visual.TextStim(self.ptw, text=msg, pos=(0, pos), units='norm', color=(1, 1, 1))
+        for text in self.menu:
             text.draw()
-            pos -= .1
 
     def setup_cal_display(self):
         """
@@ -239,17 +287,11 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
         -------
         void
         """
-        pos = x - self.displaySize[0]/2, -(y-self.displaySize[1]/2)
-        outer_target = visual.PatchStim(self.ptw, tex=None, mask='circle',
-                                        units=self.units, pos=pos,
-                                        size=self.targetsize_out,
-                                        color=self.outer_tgcol)
-        inner_target = visual.PatchStim(self.ptw, tex=None, mask='circle',
-                                        units=self.units, pos=pos,
-                                        size=self.targetsize_in,
-                                        color=self.inner_tgcol)
-        outer_target.draw()
-        inner_target.draw()
+        pos = x - self.xc, self.yc - y
+        self.outer_target.pos = pos
+        self.inner_target.pos = pos
+        self.outer_target.draw()
+        self.inner_target.draw()
         self.ptw.flip()
 
     def draw_fixation(self, x, y, flip=True):
@@ -265,14 +307,10 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
         -------
         void
         """
-        outer_target =  visual.Circle(self.ptw, units=self.units, pos=(x, y),
-                                      radius=self.targetsize_out, fillColor=None,
-                                      lineColor=self.outer_tgcol)
-        inner_target =  visual.Circle(self.ptw, units=self.units, pos=(x, y),
-                                      radius=self.targetsize_in, fillColor=self.inner_tgcol,
-                                      lineColor=self.inner_tgcol)
-        outer_target.draw()
-        inner_target.draw()
+        self.outer_fixation.pos = (x, y)
+        self.inner_fixation.pos = (x, y)
+        self.outer_fixation.draw()
+        self.inner_fixation.draw()
 
     def draw_eye(self, x, y, flip=True):
         """
@@ -291,10 +329,8 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
         # Transform coordinates to eye-tracker coordinates system
         pos = self.el2Screen([x, y],False)
 
-        eye = visual.PatchStim(self.ptw, tex=None, mask='circle',
-                               units=self.units, pos=pos,
-                               size=(20, 20), color='red')
-        eye.draw()
+        self.eye.pos = pos
+        self.eye.draw()
         if flip:
             self.ptw.flip()
 
@@ -304,18 +340,7 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
 
     def getColorFromIndex(self, colorindex):
         """Return psychopy colors for varius objects"""
-        if colorindex == pylink.CR_HAIR_COLOR:
-            return 255, 255, 255, 255
-        elif colorindex == pylink.PUPIL_HAIR_COLOR:
-            return 255, 255, 255, 255
-        elif colorindex == pylink.PUPIL_BOX_COLOR:
-            return 0, 255, 0, 255
-        elif colorindex == pylink.SEARCH_LIMIT_BOX_COLOR:
-            return 255, 0, 0, 255
-        elif colorindex == pylink.MOUSE_CURSOR_COLOR:
-            return 255, 0, 0, 255
-        else:
-            return 0, 0, 0, 0
+        return CROSSHAIR_COLORS.get(colorindex, (0, 0, 0, 0))
 
     def draw_losenge(self, x, y, width, height, colorindex):
         """Draw the cross hair at (x,y) """
@@ -342,11 +367,11 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
         if not self.dummy:
             updatedPos = np.empty(2)
             if toEl:
-                updatedPos[0] = pos[0] + 0.5*self.sizeX
-                updatedPos[1] = (self.displaySize[1] * 0.5) - pos[1]
+                updatedPos[0] = pos[0] + self.xc
+                updatedPos[1] = self.yc - pos[1]
             else:
-                updatedPos[0] = pos[0] - self.displaySize[0] * 0.5
-                updatedPos[1] = -(pos[1] - self.displaySize[1] * 0.5)
+                updatedPos[0] = pos[0] - self.xc
+                updatedPos[1] = self.yc - pos[1]
             return updatedPos
         else:
             return pos
@@ -357,52 +382,7 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
         :rtype : object
         """
         if event:
-            if event == 'f1':
-                key = pylink.F1_KEY
-            elif event == 'f2':
-                key = pylink.F2_KEY
-            elif event == 'f3':
-                key = pylink.F3_KEY
-            elif event == 'f4':
-                key = pylink.F4_KEY
-            elif event == 'f5':
-                key = pylink.F5_KEY
-            elif event == 'f6':
-                key = pylink.F6_KEY
-            elif event == 'f7':
-                key = pylink.F7_KEY
-            elif event == 'f8':
-                key = pylink.F8_KEY
-            elif event == 'f9':
-                key = pylink.F9_KEY
-            elif event == 'f10':
-                key = pylink.F10_KEY
-            elif event == 'pageup':
-                key = pylink.PAGE_UP
-            elif event == 'pagedown':
-                key = pylink.PAGE_DOWN
-            elif event == 'up':
-                key = pylink.CURS_UP
-            elif event == 'down':
-                key = pylink.CURS_DOWN
-            elif event == 'left':
-                key = pylink.CURS_LEFT
-            elif event == 'right':
-                key = pylink.CURS_RIGHT
-            elif event == 'backspace':
-                key = '\b'
-            elif event == 'return':
-                key = pylink.ENTER_KEY
-            elif event == 'escape':
-                key = pylink.ESC_KEY
-            elif event == 'tab':
-                key = '\t'
-            elif event == 'c':
-                key = pygame.K_c
-            elif event == 'v':
-                key = pygame.K_v
-            else:
-                key = event
+            key = KEY_MAPPING.get(event, event)
 
             if key == pylink.JUNK_KEY:
                 return 0
@@ -416,14 +396,8 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
         :return: list of pressed key
         :rtype: list
         """
-        ky = []
-        for key in event.getKeys():
-            tkey = self.key_mapping(key)
-            if tkey in ['lshift', 'rshift']:
-                mod = 1
-            else:
-                mod = 0
-            ky.append(pylink.KeyInput(tkey, mod))
+        # Shift keys are not remapped, so the modifier can be checked on psychopy's key name
+        ky = [pylink.KeyInput(self.key_mapping(key), int(key in ('lshift', 'rshift'))) for key in event.getKeys()]
         event.clearEvents()
         return ky
 
@@ -450,6 +424,12 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
         :return:
         """
         self.size = (w, h)
+        self._alloc_image_buffers(w, h)
+
+        # Scaling and positions only depend on the image size: computed once here rather than for every frame
+        self.sf = h / 320.
+        self.img_size = (self.sf * w, self.sf * h)
+        self.title_pos = (0, 0 - w * self.sf / 2.0 - 20)
         # self.clear_cal_display()
         self.title.autoDraw = True
         self.last_mouse_state = -1
@@ -457,35 +437,63 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
     def image_title(self, text):#
         '''Draw title text at the bottom of the screen for camera setup'''
         # self.clear_cal_display()
-        title_pos = (0, 0-self.size[0]*self.sf/2.0-20)
-        self.title.pos = title_pos
+        self.title.pos = self.title_pos
         self.title.text = text
 
     def set_image_palette(self, r,g,b): #
         '''Given a set of RGB colors, create a list of 24bit numbers representing the pallet.
         I.e., RGB of (1,64,127) would be saved as 82047, or the number 00000001 01000000 011111111'''
-        self.imagebuffer = array.array(self.imgBuffInitType)
         # self.clear_cal_display()
-        sz = len(r)
-        i =0
-        self.pal = []
-        while i < sz:
-            rf = int(b[i])
-            gf = int(g[i])
-            bf = int(r[i])
-            self.pal.append((rf << 16) | (gf << 8) | bf)
-            i += 1
-
-    def draw_title(self):
+        # Lookup table indexed by camera pixel values (red and blue are swapped: RGBX pixels in little-endian order)
+        self.pal = (np.asarray(b, dtype=np.uint32) << 16) | (np.asarray(g, dtype=np.uint32) << 8) \
+            | np.asarray(r, dtype=np.uint32)
+
+        # Checked once here rather than for every pixel: any 8-bit camera pixel value must have a palette entry
+        if len(self.pal) < 256:
+            self.pal = np.concatenate((self.pal, np.zeros(256 - len(self.pal), dtype=np.uint32)))
+
+    def _alloc_image_buffers(self, width, height):
         """
-        desc:
-            Draws title info.
+        Allocate camera image buffers (reused for every frame of this size)
+        :param width: image width
+        :param height: image height
+        """
+        self.rawbuffer = np.empty((height, width), dtype=np.uint8)
+        self.imagebuffer = np.empty((height, width), dtype=np.uint32)
+
+    def _fill_image_line(self, width, line, totlines, buff):
+        """
+        Store a line of the camera image. Once the last line has been received, the whole image is converted to RGBX
+        pixels into the image buffer
+        :param width: width of the image
+        :param line: line number of current line (starts at 1)
+        :param totlines: total number of lines in the image
+        :param buff: line buffer (palette indices)
         """
-        y = 0
-        for line in self.title:
-            surf = self.font.render(line, 0, self.color['font'])
-            self.cam_img.blit(surf, (1, y))
-            y += 12
+        # New frame: buffers are only reallocated if the image size has changed
+        if line == 1 and (self.rawbuffer is None or self.rawbuffer.shape != (totlines, width)):
+            self._alloc_image_buffers(width, totlines)
+
+        # Converted straight into the preallocated row (no temporary array per line)
+        self.rawbuffer[line - 1] = buff[:width]
+
+        if line == totlines:
+            np.take(self.pal, self.rawbuffer, out=self.imagebuffer)
+
+    def _draw_camera_image(self, img, size):
+        """
+        Draw camera image. The same image stimulus is reused for every frame (scaling is done when drawing)
+        :param img: camera image
+        :type img: PIL.Image
+        :param size: displayed size of the image (in pixels)
+        :type size: tuple
+        """
+        if self.img_stim is None:
+            self.img_stim = visual.ImageStim(self.ptw, image=img, units=self.units, size=size)
+        else:
+            self.img_stim.image = img
+            self.img_stim.size = size
+        self.img_stim.draw()
 
     def draw_cross_hair(self):
         """
@@ -496,27 +504,16 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
 
     def draw_image_line_new(self, width, line, totlines, buff):  #
         '''Display image given pixel by pixel'''
-        i = 0
-        while i < width:
-            self.imagebuffer.append(self.pal[buff[i]])
-            i += 1
+        self._fill_image_line(width, line, totlines, buff)
 
         if line == totlines:
-            bufferv = self.imagebuffer.tostring()
-            if float(self.psychopyVer[:4]) < 1.83:
-                img = Image.fromstring("RGBX", (width, totlines), bufferv)
-            else:
-                img = Image.frombytes("RGBX", (width, totlines), bufferv)
+            # Image shares the memory of the image buffer (no copy)
+            img = Image.frombuffer("RGBX", (width, totlines), self.imagebuffer, 'raw', "RGBX", 0, 1)
 
-            imgResize = img.resize((self.size[0] * self.sf, self.size[1] * self.sf))
-            imgResizeVisual = visual.ImageStim(self.ptw, image=imgResize)
-
-            imgResizeVisual.draw()
+            self._draw_camera_image(img, self.img_size)
             self.draw_cross_hair()
             self.ptw.flip()
 
-            self.imagebuffer = array.array(self.imgBuffInitType)
-
     def draw_image_line(self, width, line, totlines, buff):
         """
         Draws a single eye video frame, line by line.
@@ -529,43 +526,18 @@ class EyeLinkCoreGraphicsPsychopy(pylink.EyeLinkCustomDisplay):
         """
 
         # If the buffer hasn't been filled yet, add a line.
-        for i in range(width):
-            try:
-                self.imagebuffer.append(self.pal[buff[i]])
-            except:
-                pass
+        self._fill_image_line(width, line, totlines, buff)
 
         # If the buffer is full, push it to the display.
         if line == totlines:
-            self.sf = totlines/320.
-            self._size = int(self.sf*self.size[0]), int(
-                self.sf*self.size[1])
-            # Convert the image buffer to a pygame image, save it ...
-            try:
-                # This is based on PyLink >= 1.1
-                self.cam_img = pygame.image.fromstring(
-                    self.imagebuffer.tostring(), self._size, 'RGBX')
-            except:
-                # This is for PyLink <= 1.0. This try ... except construction
-                # is a hack. It would be better to understand the difference
-                # between these two versions.
-                self.cam_img = pygame.image.fromstring(
-                    self.imagebuffer.tostring(), self.size, 'RGBX')
-                self.sf = 1.
+            # Wrap the image buffer into an image (no copy) ...
+            img = Image.frombuffer("RGBX", (width, totlines), self.imagebuffer, 'raw', "RGBX", 0, 1)
             if self.extra_info:
                 self.draw_cross_hair()
-                #self.draw_title()
-
-            pygame.image.save(self.cam_img, self.tmp_file)
 
             # ... and then show the image.
+            self._draw_camera_image(img, self.img_size)
             self.ptw.flip()
-            imgStim = visual.ImageStim(self.ptw, image=self.tmp_file, size=self.sf*self.size[0])
-            imgStim.draw()
-            self.ptw.flip()
-
-            # Clear the buffer for the next round!
-            self.imagebuffer = array.array('L')
 
     def draw_line(self, x1, y1, x2, y2, colorindex):
         """
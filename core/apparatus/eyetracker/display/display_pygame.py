@@ -26,9 +26,52 @@ import pygame.event
 import pygame.image
 import pygame.draw
 import pygame.mouse
-import array
+import pygame.transform
+import math
+import numpy as np
 from pygame.constants import *
-from PIL import Image
+
+# Mapping between pygame's and Eyelink's key codes (junk key first, so that it does not hide any other key)
+KEY_MAPPING = {
+    pylink.JUNK_KEY: 0,
+    K_F1: pylink.F1_KEY,
+    K_F2: pylink.F2_KEY,
+    K_F3: pylink.F3_KEY,
+    K_F4: pylink.F4_KEY,
+    K_F5: pylink.F5_KEY,
+    K_F6: pylink.F6_KEY,
+    K_F7: pylink.F7_KEY,
+    K_F8: pylink.F8_KEY,
+    K_F9: pylink.F9_KEY,
+    K_F10: pylink.F10_KEY,
+    K_PAGEUP: pylink.PAGE_UP,
+    K_PAGEDOWN: pylink.PAGE_DOWN,
+    K_UP: pylink.CURS_UP,
+    K_DOWN: pylink.CURS_DOWN,
+    K_LEFT: pylink.CURS_LEFT,
+    K_RIGHT: pylink.CURS_RIGHT,
+    K_BACKSPACE: ord('\b'),
+    K_RETURN: pylink.ENTER_KEY,
+    K_ESCAPE: pylink.ESC_KEY,
+    K_TAB: ord('\t')
+}
+
+# Colors of camera image's crosshair elements (RGBA)
+CROSSHAIR_COLORS = {
+    pylink.CR_HAIR_COLOR: (255, 255, 255, 255),
+    pylink.PUPIL_HAIR_COLOR: (255, 255, 255, 255),
+    pylink.PUPIL_BOX_COLOR: (0, 255, 0, 255),
+    pylink.SEARCH_LIMIT_BOX_COLOR: (255, 0, 0, 255),
+    pylink.MOUSE_CURSOR_COLOR: (255, 0, 0, 255)
+}
+
+# Feedback sound played for each beep
+BEEPS = {
+    pylink.DC_TARG_BEEP: 'target',
+    pylink.CAL_TARG_BEEP: 'target',
+    pylink.CAL_ERR_BEEP: 'error',
+    pylink.DC_ERR_BEEP: 'error'
+}
 
 
 class KeyInput:
@@ -49,21 +92,36 @@ class DisplayPygame(pylink.EyeLinkCustomDisplay):
     """
 
     """
+
+    __sounds = None  # Feedback sounds (shared by all instances)
+    __lozenge_cache = {}  # Lozenges' outlines indexed by lozenge's size (width, height)
+    __arc_points = 9  # Number of vertices per semicircle of lozenges' outlines
+
     def __init__(self, gui):
         pylink.EyeLinkCustomDisplay.__init__(self)
 
         self.gui = gui
         self.ptw = pygame.display.get_surface()
+        self.__double_buffer = bool(self.ptw.get_flags() & DOUBLEBUF)  # Display with a back buffer
+        self.__ptw_size = self.ptw.get_size()  # Display size (does not change during the session)
 
-        if not pygame.mixer.init():
+        if not pygame.mixer.get_init():
             pygame.mixer.init(44100, -16, 2, 2048)
 
-        self.__target_beep__ = pygame.mixer.Sound("type.wav")
-        self.__target_beep__done__ = pygame.mixer.Sound("qbeep.wav")
-        self.__target_beep__error__ = pygame.mixer.Sound("error.wav")
-        self.imagebuffer = array.array('l')
+        # Sounds are only loaded by the first instance
+        if DisplayPygame.__sounds is None:
+            DisplayPygame.__sounds = {
+                'target': pygame.mixer.Sound("type.wav"),
+                'done': pygame.mixer.Sound("qbeep.wav"),
+                'error': pygame.mixer.Sound("error.wav")
+            }
+        self.imagebuffer = None  # Camera image (one 32-bit RGBX pixel per camera pixel)
+        self.rawbuffer = None  # Camera image (palette indices)
         self.pal = None
         self.size = (0, 0)
+        self.__img_size = (0, 0)  # Size of displayed camera image
+        self.__img_scale = (1.0, 1.0)  # Scaling factors from camera image to displayed image coordinates
+        self.__img_pos = (0, 0)  # Position of displayed camera image's top-left corner (centered on the display)
 
         # Fonts
         if not pygame.font.get_init():
@@ -71,10 +129,21 @@ class DisplayPygame(pylink.EyeLinkCustomDisplay):
         self.fnt = pygame.font.Font(None, 20)
         self.fnt.set_bold(1)
 
+        # Inputs
+        self.__pending_keys = []  # Key events collected while drawing (consumed by get_input_key())
+
         # Mouses
         self.last_mouse_state = -1
         pygame.mouse.set_visible(gui.eyetracker.dummy)
 
+        # Calibration target (size and colors do not change: only the target's position is updated)
+        outsz = gui.targetsize_out  # Target outer size
+        insz = gui.targetsize_in  # inner dot size
+        self.__target_out = pygame.Rect(0, 0, outsz[0] * 2, outsz[1] * 2)
+        self.__target_in = pygame.Rect(0, 0, insz[0] * 2, insz[1] * 2)
+        self.__target_out_col = gui.outer_tgcol
+        self.__target_in_col = gui.inner_tgcol
+
     def setup_cal_display(self):
         """
         Set calibration display
@@ -110,12 +179,14 @@ class DisplayPygame(pylink.EyeLinkCustomDisplay):
         :param x:
         :param y:
         """
-        outsz = self.gui.targetsize_out  # Target outer size
-        insz = self.gui.targetsize_in  # inner dot size
-        rect = pygame.Rect(x - outsz[0], y - outsz[1], outsz[0] * 2, outsz[1] * 2)
-        pygame.draw.ellipse(self.ptw, self.gui.outer_tgcol, rect)
-        rect = pygame.Rect(x - insz[0], y - insz[1], insz[0] * 2, insz[1] * 2)
-        pygame.draw.ellipse(self.ptw, self.gui.inner_tgcol, rect)
+        self.__target_out.center = (x, y)
+        self.__target_in.center = (x, y)
+        pygame.draw.ellipse(self.ptw, self.__target_out_col, self.__target_out)
+        pygame.draw.ellipse(self.ptw, self.__target_in_col, self.__target_in)
+
+        # Collect inputs before flipping: flip() blocks until next refresh, and keys pressed meanwhile would otherwise
+        # only be handled after the next frame
+        self.__pending_keys.extend(pygame.event.get(KEYDOWN))
         pygame.display.flip()
 
     def play_beep(self, beepid):
@@ -123,86 +194,60 @@ class DisplayPygame(pylink.EyeLinkCustomDisplay):
         Play a beep as feedback
         :param beepid:
         """
-        if beepid == pylink.DC_TARG_BEEP or beepid == pylink.CAL_TARG_BEEP:
-            self.__target_beep__.play()
-        elif beepid == pylink.CAL_ERR_BEEP or beepid == pylink.DC_ERR_BEEP:
-            self.__target_beep__error__.play()
-        else:  # CAL_GOOD_BEEP or DC_GOOD_BEEP
-            self.__target_beep__done__.play()
+        # CAL_GOOD_BEEP or DC_GOOD_BEEP by default
+        self.__sounds[BEEPS.get(beepid, 'done')].play()
 
     def getColorFromIndex(self, colorindex):
-        if colorindex == pylink.CR_HAIR_COLOR:
-            return (255, 255, 255, 255)
-        elif colorindex == pylink.PUPIL_HAIR_COLOR:
-            return (255, 255, 255, 255)
-        elif colorindex == pylink.PUPIL_BOX_COLOR:
-            return (0, 255, 0, 255)
-        elif colorindex == pylink.SEARCH_LIMIT_BOX_COLOR:
-            return (255, 0, 0, 255)
-        elif colorindex == pylink.MOUSE_CURSOR_COLOR:
-            return (255, 0, 0, 255)
-        else:
-            return (0, 0, 0, 0)
+        return CROSSHAIR_COLORS.get(colorindex, (0, 0, 0, 0))
 
     def draw_line(self, x1, y1, x2, y2, colorindex):
         color = self.getColorFromIndex(colorindex)
-        imr = self.__img__.get_rect()
+        sx, sy = self.__img_scale
 
-        x1 = int((float(x1) / float(self.size[0])) * imr.w)
-        x2 = int((float(x2) / float(self.size[0])) * imr.w)
-        y1 = int((float(y1) / float(self.size[1])) * imr.h)
-        y2 = int((float(y2) / float(self.size[1])) * imr.h)
+        x1 = int(x1 * sx)
+        x2 = int(x2 * sx)
+        y1 = int(y1 * sy)
+        y2 = int(y2 * sy)
         pygame.draw.line(self.__img__, color, (x1, y1), (x2, y2))
 
     def draw_lozenge(self, x, y, width, height, colorindex):
         color = self.getColorFromIndex(colorindex)
 
-        imr = self.__img__.get_rect()
-        x = int((float(x) / float(self.size[0])) * imr.w)
-        width = int((float(width) / float(self.size[0])) * imr.w)
-        y = int((float(y) / float(self.size[1])) * imr.h)
-        height = int((float(height) / float(self.size[1])) * imr.h)
-
-        if width > height:
-            rad = height / 2
-
-            #draw the lines
-            pygame.draw.line(self.__img__, color, (x + rad, y), (x + width - rad, y))
-            pygame.draw.line(self.__img__, color, (x + rad, y + height), (x + width - rad, y + height))
-
-            #draw semicircles
-            pos = (x + rad, y + rad)
-            clip = (x, y, rad, rad * 2)
-            self.__img__.set_clip(clip)
-            pygame.draw.circle(self.__img__, color, pos, rad, 1)
-            self.__img__.set_clip(imr)
-
-            pos = ((x + width) - rad, y + rad)
-            clip = ((x + width) - rad, y, rad, rad * 2)
-            self.__img__.set_clip(clip)
-            pygame.draw.circle(self.__img__, color, pos, rad, 1)
-            self.__img__.set_clip(imr)
-        else:
-            rad = width / 2
-
-            # draw the lines
-            pygame.draw.line(self.__img__, color, (x, y + rad), (x, y + height - rad))
-            pygame.draw.line(self.__img__, color, (x + width, y + rad), (x + width, y + height - rad))
-
-            # draw semicircles
-            if rad == 0:
-                return  # cannot draw sthe circle with 0 radius
-            pos = (x + rad, y + rad)
-            clip = (x, y, rad * 2, rad)
-            self.__img__.set_clip(clip)
-            pygame.draw.circle(self.__img__, color, pos, rad, 1)
-            self.__img__.set_clip(imr)
-
-            pos = (x + rad, y + height - rad)
-            clip = (x, y + height - rad, rad * 2, rad)
-            self.__img__.set_clip(clip)
-            pygame.draw.circle(self.__img__, color, pos, rad, 1)
-            self.__img__.set_clip(imr)
+        sx, sy = self.__img_scale
+        x = int(x * sx)
+        width = int(width * sx)
+        y = int(y * sy)
+        height = int(height * sy)
+
+        vertices = [(x + vx, y + vy) for vx, vy in self.__lozenge_outline(width, height)]
+        pygame.draw.polygon(self.__img__, color, vertices, 1)
+
+    def __lozenge_outline(self, width, height):
+        """
+        Get lozenge's outline (polygon made of two straight lines joined by two semicircles)
+        :param width: lozenge's width
+        :param height: lozenge's height
+        :return: vertices relative to lozenge's top-left corner
+        :rtype: list
+        """
+        key = (width, height)
+        if key not in self.__lozenge_cache:
+            if width > height:
+                # Left and right semicircles
+                rad = height // 2
+                arcs = (((rad, rad), math.pi / 2), ((width - rad, rad), -math.pi / 2))
+            else:
+                # Top and bottom semicircles
+                rad = width // 2
+                arcs = (((rad, rad), math.pi), ((rad, height - rad), 0.0))
+
+            vertices = []
+            for (cx, cy), start in arcs:
+                for i in range(self.__arc_points):
+                    angle = start + math.pi * i / (self.__arc_points - 1)
+                    vertices.append((int(round(cx + rad * math.cos(angle))), int(round(cy + rad * math.sin(angle)))))
+            self.__lozenge_cache[key] = vertices
+        return self.__lozenge_cache[key]
 
     def get_mouse_state(self):
         """
@@ -220,68 +265,26 @@ class DisplayPygame(pylink.EyeLinkCustomDisplay):
         Get keyboard input
         :return:
         """
-        ky = []
-        v = pygame.event.get()
-        for key in v:
-            if key.type != KEYDOWN:
-                continue
-            keycode = key.key
-            if keycode == K_F1:
-                keycode = pylink.F1_KEY
-            elif keycode == K_F2:
-                keycode = pylink.F2_KEY
-            elif keycode == K_F3:
-                keycode = pylink.F3_KEY
-            elif keycode == K_F4:
-                keycode = pylink.F4_KEY
-            elif keycode == K_F5:
-                keycode = pylink.F5_KEY
-            elif keycode == K_F6:
-                keycode = pylink.F6_KEY
-            elif keycode == K_F7:
-                keycode = pylink.F7_KEY
-            elif keycode == K_F8:
-                keycode = pylink.F8_KEY
-            elif keycode == K_F9:
-                keycode = pylink.F9_KEY
-            elif keycode == K_F10:
-                keycode = pylink.F10_KEY
-
-            elif keycode == K_PAGEUP:
-                keycode = pylink.PAGE_UP
-            elif keycode == K_PAGEDOWN:
-                keycode = pylink.PAGE_DOWN
-            elif keycode == K_UP:
-                keycode = pylink.CURS_UP
-            elif keycode == K_DOWN:
-                keycode = pylink.CURS_DOWN
-            elif keycode == K_LEFT:
-                keycode = pylink.CURS_LEFT
-            elif keycode == K_RIGHT:
-                keycode = pylink.CURS_RIGHT
-
-            elif keycode == K_BACKSPACE:
-                keycode = ord('\b')
-            elif keycode == K_RETURN:
-                keycode = pylink.ENTER_KEY
-            elif keycode == K_ESCAPE:
-                keycode = pylink.ESC_KEY
-            elif keycode == K_TAB:
-                keycode = ord('\t')
-            elif (keycode == pylink.JUNK_KEY):
-                keycode = 0
-
-            ky.append(pylink.KeyInput(keycode, key.mod))
-        return ky
+        keys = self.__pending_keys + pygame.event.get(KEYDOWN)
+        self.__pending_keys = []
+
+        # Other events are not used (mouse is polled): drop them so that they do not fill the event queue
+        pygame.event.clear()
+        return [pylink.KeyInput(KEY_MAPPING.get(key.key, key.key), key.mod) for key in keys]
 
     def exit_image_display(self):
         self.clear_cal_display()
 
     def alert_printf(self, msg):
-        print "alert_printf"
+        print("alert_printf")
 
     def setup_image_display(self, width, height):
         self.size = (width, height)
+        self.__img_size = (width * 3, height * 3)
+        self.__img_scale = (float(self.__img_size[0]) / width, float(self.__img_size[1]) / height)
+        self.__img_pos = ((self.__ptw_size[0] - self.__img_size[0]) // 2,
+                          (self.__ptw_size[1] - self.__img_size[1]) // 2)
+        self.__alloc_image_buffers(width, height)
         self.clear_cal_display()
         self.last_mouse_state = -1
 
@@ -290,50 +293,61 @@ class DisplayPygame(pylink.EyeLinkCustomDisplay):
 
         sz = self.fnt.size(text[0])
         txt = self.fnt.render(text, len(text), (0, 0, 0, 255), (255, 255, 255, 255))
-        imgsz = (self.size[0] * 3, self.size[1] * 3)
-        topleft = ((self.ptw.get_rect().w - imgsz[0]) / 2, (self.ptw.get_rect().h - imgsz[1]) / 2)
-        imsz = (topleft[0], topleft[1] + imgsz[1] + 10)
-        self.ptw.blit(txt, imsz)
-        pygame.display.flip()
-        self.ptw.blit(txt, imsz)
+        imsz = (self.__img_pos[0], self.__img_pos[1] + self.__img_size[1] + 10)
+        self.__show(txt, imsz)
+
+    def __show(self, surface, pos):
+        """
+        Draw surface on the display and only refresh the area it covers
+        On double-buffered displays, the whole display is flipped and the surface is drawn on the back buffer too
+        :param surface: surface to draw
+        :param pos: position of surface's top-left corner
+        """
+        if self.__double_buffer:
+            self.ptw.blit(surface, pos)
+            pygame.display.flip()
+            self.ptw.blit(surface, pos)  # draw on the back buffer too
+        else:
+            pygame.display.update(self.ptw.blit(surface, pos))
+
+    def __alloc_image_buffers(self, width, height):
+        """
+        Allocate camera image buffers (reused for every frame of this size)
+        :param width: image width
+        :param height: image height
+        """
+        self.rawbuffer = np.empty((height, width), dtype=np.uint8)
+        self.imagebuffer = np.empty((height, width), dtype=np.uint32)
 
     def draw_image_line(self, width, line, totlines, buff):
-        # print "draw_image_line", len(buff)
-        i = 0
-        while i < width:
-            self.imagebuffer.append(self.pal[buff[i]])
-            i += 1
+        # New frame: buffers are only reallocated if the image size has changed
+        if line == 1 and (self.rawbuffer is None or self.rawbuffer.shape != (totlines, width)):
+            self.__alloc_image_buffers(width, totlines)
 
-        if line == totlines:
-            imgsz = (self.size[0] * 3, self.size[1] * 3)
-            bufferv = self.imagebuffer.tostring()
-            img = Image.new("RGBX", self.size)
-            img.fromstring(bufferv)
-            img = img.resize(imgsz)
+        # Lines are only stored as palette indices: the whole image is converted at once
+        self.rawbuffer[line - 1] = np.asarray(buff[:width], dtype=np.uint8)
 
-            img = pygame.image.fromstring(img.tostring(), imgsz, "RGBX")
+        if line == totlines:
+            np.take(self.pal, self.rawbuffer, out=self.imagebuffer)
+            imgsz = self.__img_size
+            # Surface shares image buffer's memory (no copy): it is only used to make the scaled image
+            img = pygame.image.frombuffer(self.imagebuffer, (width, totlines), "RGBX")
+            img = pygame.transform.smoothscale(img, imgsz)
 
             self.__img__ = img
             self.draw_cross_hair()
             self.__img__ = None
-            self.ptw.blit(img, ((self.ptw.get_rect().w - imgsz[0]) / 2, (self.ptw.get_rect().h - imgsz[1]) / 2))
-            pygame.display.flip()
-            self.ptw.blit(img, (
-                (self.ptw.get_rect().w - imgsz[0]) / 2, (self.ptw.get_rect().h - imgsz[1]) / 2))  # draw on the back buffer too
-            self.imagebuffer = array.array('l')
+            self.__show(img, self.__img_pos)
 
     def set_image_palette(self, r, g, b):
-        self.imagebuffer = array.array('l')
         self.clear_cal_display()
-        sz = len(r)
-        i = 0
-        self.pal = []
-        while i < sz:
-            rf = int(b[i])
-            gf = int(g[i])
-            bf = int(r[i])
-            self.pal.append((rf << 16) | (gf << 8) | (bf))
-            i += 1
+        # Lookup table indexed by camera pixel values (red and blue are swapped: RGBX pixels in little-endian order)
+        self.pal = (np.asarray(b, dtype=np.uint32) << 16) | (np.asarray(g, dtype=np.uint32) << 8) \
+            | np.asarray(r, dtype=np.uint32)
+
+        # Checked once here rather than for every pixel: any 8-bit camera pixel value must have a palette entry
+        if len(self.pal) < 256:
+            self.pal = np.concatenate((self.pal, np.zeros(256 - len(self.pal), dtype=np.uint32)))
 
     def showmsg(self, msg, color=(255, 255, 255)):
         text = self.fnt.render(msg, 1, color)
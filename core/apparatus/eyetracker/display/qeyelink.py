@@ -34,6 +34,33 @@ import sys, threading, time, collections, random, numpy as np
 from PyQt4 import QtCore, QtGui
 import pylink
 
+# Logger
+import logging
+logger = logging.getLogger("EasyExp")
+
+# Mapping between Qt's and Eyelink's special key codes
+KEY_MAPPING = {
+    QtCore.Qt.Key_F1: pylink.F1_KEY,
+    QtCore.Qt.Key_F2: pylink.F2_KEY,
+    QtCore.Qt.Key_F3: pylink.F3_KEY,
+    QtCore.Qt.Key_F4: pylink.F4_KEY,
+    QtCore.Qt.Key_F5: pylink.F5_KEY,
+    QtCore.Qt.Key_F6: pylink.F6_KEY,
+    QtCore.Qt.Key_F7: pylink.F7_KEY,
+    QtCore.Qt.Key_F8: pylink.F8_KEY,
+    QtCore.Qt.Key_F9: pylink.F9_KEY,
+    QtCore.Qt.Key_F10: pylink.F10_KEY,
+    QtCore.Qt.Key_Enter: pylink.ENTER_KEY,  # numpad enter
+    QtCore.Qt.Key_Return: pylink.ENTER_KEY,  # main enter
+    QtCore.Qt.Key_Left: pylink.CURS_LEFT,
+    QtCore.Qt.Key_Up: pylink.CURS_UP,
+    QtCore.Qt.Key_Right: pylink.CURS_RIGHT,
+    QtCore.Qt.Key_Down: pylink.CURS_DOWN,
+    QtCore.Qt.Key_PageUp: pylink.PAGE_UP,
+    QtCore.Qt.Key_PageDown: pylink.PAGE_DOWN,
+    QtCore.Qt.Key_Escape: pylink.ESC_KEY
+}
+
 
 class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
     """
@@ -50,7 +77,7 @@ class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
         pylink.EyeLinkCustomDisplay.__init__(self)
 
         self.tracker = tracker
-        print("tracker: {}".format(self.tracker))
+        logger.debug("[%s] tracker: %s", __name__, self.tracker)
 
         # window initialization
         self.setGeometry(1680, 0, 1680, 1260)
@@ -58,12 +85,14 @@ class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
         self.setFocusPolicy(QtCore.Qt.StrongFocus)  # accept keyboard focus
 
         self.keyList = collections.deque()
+        self.eventInterval = 0.005  # Minimum interval between two processing of Qt events when polled for keys (s)
+        self.lastEvents = 0.0  # Time at which Qt events were last processed
 
     # self.tracker.doTrackerSetup() # halting
 
     # QWidget overloaded functions
     def keyPressEvent(self, e):
-        print("key pressed: {}".format(e.key()))
+        logger.debug("[%s] key pressed: %s", __name__, e.key())
         if e.modifiers() and QtCore.Qt.ControlModifier and e.key() == ord("Q"):
             QtCore.QCoreApplication.instance().quit()
         self.keyList.append(e.key())
@@ -78,30 +107,33 @@ class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
         # calibration
         qp.setBrush(QtGui.QColor(255, 0, 0))
         if hasattr(self, 'cal') and self.cal:
-            print("drawEllliipse")
             qp.drawEllipse(self.cal[0], self.cal[1], 30, 30)
 
         # image
-        if hasattr(self, 'image') and self.image != None:
-            scale = min(self.size().width() // self.imageSize[0], self.size().height() // self.imageSize[1])
-            pen = QtGui.QPen()
-            pen.setColor(QtGui.QColor(0, 0, 255))
-            qp.setPen(pen)
-            pen.setWidth(scale)
-            for row in range(len(self.image)):
-                # print("row: {}".format(float(sum(self.image[row])) / len(self.image[row])))
-                for column in range(len(self.image[row])):
-                    # print(" ", column, row, self.image[row][column])
-                    # self.qp.setPen(QtGui.QColor([16*self.palette[self.image[row][column]]))
-                    # self.
-                    c = self.palette[self.image[row][column]]
-                    pen.setColor(QtGui.QColor(c[0], c[1], c[2]))
-                    qp.setPen(pen)
-                    # if self.image[row][column] > 10:
-                    qp.drawPoint(column * scale, row * scale)
-                    # painter.drawImage(source, tempQImage);
+        if hasattr(self, 'image') and self.image is not None and hasattr(self, 'palette'):
+            height, width = self.image.shape
+            # RGB pixels through the palette lookup table, written into the preallocated RGB buffer (the QImage does not
+            # own its data)
+            np.take(self.palette, self.image, axis=0, out=self.imageRGB)
+            qimage = QtGui.QImage(self.imageRGB.data, width, height, 3 * width, QtGui.QImage.Format_RGB888)
+            qp.drawImage(self.imageRect(), qimage)
         qp.end()
 
+    def imageRect(self):
+        """
+        Area of the widget covered by the (scaled) camera image
+        :return: QRect
+        """
+        scale = min(self.size().width() // self.imageSize[0], self.size().height() // self.imageSize[1])
+        return QtCore.QRect(0, 0, self.imageSize[0] * scale, self.imageSize[1] * scale)
+
+    def calRect(self):
+        """
+        Area of the widget covered by the calibration target (including its outline)
+        :return: QRect
+        """
+        return QtCore.QRect(self.cal[0] - 1, self.cal[1] - 1, 32, 32)
+
     # EyeLinkCustomDisplay overloaded functions:
     def get_input_key(self):
         """
@@ -109,38 +141,21 @@ class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
         """
 
         # the next line is a highly questionable trick to use two event loops in spite of the GIL.
-        QtCore.QCoreApplication.instance().processEvents()  # use eyelink event loop for Qt events
+        # pylink polls for keys continuously, so Qt events are processed at most once every eventInterval
+        now = time.time()
+        if now - self.lastEvents >= self.eventInterval:
+            QtCore.QCoreApplication.instance().processEvents()  # use eyelink event loop for Qt events
+            self.lastEvents = now
 
         retval = []
-        while True:
-            try:
-                key = self.keyList.popleft()
-                if 0x20 <= key < 0x80:
-                    k = key  # ascii non-special keys
-                elif QtCore.Qt.Key_F1 <= key <= QtCore.Qt.Key_F10:
-                    k = pylink.F1_KEY + 0x100 * (key - QtCore.Qt.Key_F1 - 1)  # function keys
-                elif key == QtCore.Qt.Key_Enter or key == QtCore.Qt.Key_Return:
-                    k = pylink.ENTER_KEY  # main enter or numpad enter
-                elif key == QtCore.Qt.Key_Left:
-                    k = pylink.CURS_LEFT
-                elif key == QtCore.Qt.Key_Up:
-                    k = pylink.CURS_UP
-                elif key == QtCore.Qt.Key_Right:
-                    k = pylink.CURS_RIGHT
-                elif key == QtCore.Qt.Key_Down:
-                    k = pylink.CURS_DOWN
-                elif key == QtCore.Qt.Key_PageUp:
-                    k = pylink.PAGE_UP
-                elif key == QtCore.Qt.Key_PageDown:
-                    k = pylink.PAGE_DOWN
-                elif key == QtCore.Qt.Key_Escape:
-                    k = pylink.ESC_KEY
-                else:
-                    k = pylink.JUNK_KEY
-                retval.append(pylink.KeyInput(k))
-                print("get input: {} -> {}".format(key, k))
-            except IndexError:
-                return retval
+        while self.keyList:
+            key = self.keyList.popleft()
+            if 0x20 <= key < 0x80:
+                k = key  # ascii non-special keys
+            else:
+                k = KEY_MAPPING.get(key, pylink.JUNK_KEY)
+            retval.append(pylink.KeyInput(k))
+        return retval
 
     def play_beep(self, beepid):
         """
@@ -155,7 +170,7 @@ class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
         This function is called just before entering calibration or validation modes
         :return:
         """
-        print("setup_cal_display")
+        logger.debug("[%s] setup_cal_display", __name__)
 
     def draw_cal_target(self, x, y):
         """
@@ -164,18 +179,21 @@ class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
         :param y:
         :return:
         """
-        print("draw cal target {}, {}".format(x, y))
+        logger.debug("[%s] draw cal target %s, %s", __name__, x, y)
+        # Only repaint the areas of the previous and new targets
+        if hasattr(self, 'cal') and self.cal:
+            self.update(self.calRect())
         self.cal = (x, y)
         # always (0, [0, 0, 0, 0], [0, 0, 0, 0])
         # print("crosshair: {}".format(self.tracker.getImageCrossHairData()))
-        self.update()
+        self.update(self.calRect())
 
     def exit_cal_display(self):
         """
         This function is called just before exiting calibration/validation mode
         :return:
         """
-        print("exit_cal_display")
+        logger.debug("[%s] exit_cal_display", __name__)
         self.cal = None
         self.update()
 
@@ -184,14 +202,14 @@ class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
         This function is called if aborted
         :return:
         """
-        print("record abort hide")
+        logger.debug("[%s] record abort hide", __name__)
 
     def clear_cal_display(self):
         """
         Clear the calibration display
         :return:
         """
-        print("clear cal display")
+        logger.debug("[%s] clear cal display", __name__)
         self.cal = None
         self.update()
 
@@ -200,25 +218,28 @@ class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
         Erase the calibration or validation target drawn by previous call to draw_cal_target()
         :return:
         """
-        print("erase cal target")
+        logger.debug("[%s] erase cal target", __name__)
         self.update()
 
     def setup_image_display(self, width, height):
-        print("setup_image_display: {}, {}".format(width, height))
+        logger.debug("[%s] setup_image_display: %s, %s", __name__, width, height)
         self.imageSize = (width, height)
-        self.image = np.zeros([height, width], dtype="int8")
+        self.image = np.zeros([height, width], dtype=np.uint8)  # palette indices
+        self.imageRGB = np.zeros([height, width, 3], dtype=np.uint8)  # RGB pixels (reused for every repaint)
 
     def set_image_palette(self, r, g, b):
         """
-        Given a set of RGB colors, create a list of 24bit numbers representing the pallet. I.e., RGB of (1,64,127)
-        would be saved as 82047, or the number 00000001 01000000 011111111
+        Given a set of RGB colors, create a (256, 3) lookup table of RGB bytes indexed by camera pixel value
         :param r: red channel
         :param g: green channel
         :param b: blue channel
         :return:
         """
-        print("draw_image_palette: {}".format(zip(r, g, b)))
-        self.palette = zip(r, g, b)
+        palette = np.stack([np.asarray(r, np.uint8), np.asarray(g, np.uint8), np.asarray(b, np.uint8)], axis=1)
+        # Pad to 256 entries so that any pixel value can be used as an index
+        self.palette = np.zeros((256, 3), dtype=np.uint8)
+        self.palette[:len(palette)] = palette
+        logger.debug("[%s] draw_image_palette: %s", __name__, len(palette))
 
     def draw_image_line(self, width, line, totlines, buff):
         """
@@ -230,26 +251,32 @@ class QEyelink(QtGui.QWidget, pylink.EyeLinkCustomDisplay):
         :return:
         """
         # print("draw_image_line: {}, {}, {}, {}".format(width, line, totlines, buff))
-        if hasattr(self, 'image'):
-            self.image[line - 1][:] = buff
+        if hasattr(self, 'image') and self.image is not None:
+            # Copy the whole line at once (single memcpy if the buffer supports the buffer protocol)
+            if isinstance(buff, (bytes, bytearray)):
+                self.image[line - 1] = np.frombuffer(buff, dtype=np.uint8, count=width)
+            else:
+                self.image[line - 1] = np.fromiter(buff, dtype=np.uint8, count=width)
         if line == totlines:
-            print("crosshair: {}".format(self.tracker.getImageCrossHairData()))
-            self.update()
+            # Crosshair data are only requested from the tracker when they are logged
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[%s] crosshair: %s", __name__, self.tracker.getImageCrossHairData())
+            self.update(self.imageRect())  # only repaint the camera image
 
     def exit_image_display(self):
-        print("exit_image_display")
+        logger.debug("[%s] exit_image_display", __name__)
         self.image = None
         self.update()
 
     def draw_cross_hair(self, surf):
-        print("draw_cross_hair: {}".format(surf))
+        logger.debug("[%s] draw_cross_hair: %s", __name__, surf)
 
     def alert_printf(self, msg):
-        print("alert: {}".format(msg))
+        logger.warning("[%s] alert: %s", __name__, msg)
 
     def image_title(self, text):
         # LEFT, HEAD, RIGHT
-        print("title: {}".format(text))
+        logger.debug("[%s] title: %s", __name__, text)
 
 
 if __name__ == "__main__":
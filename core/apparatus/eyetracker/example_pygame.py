@@ -20,23 +20,21 @@
 
 # Imports
 from __future__ import print_function
-import time
+from functools import partial
+from timeit import default_timer
 from eyetracker import EyeTracker, Checking
 from misc.conversion import deg2pix
 from psychopy import event
 
+QUIT_KEYS = frozenset(('q', 'escape'))  # Keys exiting the example
+
 
 def stop_exp():
     """
     Exit example if ESCAPE is pressed
     :return:
     """
-    allKeys = event.getKeys()
-    quit = False
-    for thisKey in allKeys:
-        if thisKey in ['q', 'escape']:
-            quit =True
-    return quit
+    return not QUIT_KEYS.isdisjoint(event.getKeys())
 
 
 display_type = 'psychopy'  # window's type (pygame, psychopy, qt)
@@ -47,7 +45,7 @@ use_dummy = False  # flag for using dummy mode (mouse simulates eye position)
 
 link = "100.1.1.1"  # Eyetracker IP (100.1.1.1 = localhost)
 
-if display_type is 'psychopy':
+if display_type == 'psychopy':
     # If we use a psychopy window
     from psychopy import visual, monitors
     # Window
@@ -58,7 +56,9 @@ if display_type is 'psychopy':
         pos=(0, 0),
         size=resolution,
         units='pix',
-        fullscr=False)
+        fullscr=False,
+        waitBlanking=True,  # flips are synchronized with the screen refresh
+        useFBO=False)  # draw directly to the back buffer
     resolution = win.size
     normRatio = (resolution[1]/float(resolution[0]))
     distance = win.scrDistCM
@@ -98,6 +98,13 @@ eyetracker.calibration.calibrate()
 # Start trials
 stopexp = False
 radius_px = deg2pix(size=1.5, height=screen_size[1], distance=distance, resolution=resolution[1])
+radiusCircle = visual.Circle(win, units='pix', pos=center, radius=checking.radius, fillColor=None)
+
+# Objects used on every frame
+gui = eyetracker.display.gui
+screen_center = eyetracker.display.center
+fixation_test = partial(checking.fixationtest, opt='fix', isfix=False, fixation_duration=2, time_to_fixate=2, radius=1,
+                        rx=200, ry=200)
 
 for trialID in range(5):
     # Starting routine
@@ -108,13 +115,16 @@ for trialID in range(5):
     isfix=False
     while not fix and not stopexp:
         # Test fixation
-        fix = checking.fixationtest(opt='fix', isfix=False, fixation_duration=2, time_to_fixate=2, radius=1, rx=200, ry=200)
+        fix, fixated = fixation_test()
+
+        # A new Eye instance is created whenever recording (re)starts (e.g. after a calibration)
+        eye = eyetracker.eye
 
         # Draw eye position
-        eyetracker.eye.draw(flip=False)
+        eye.draw(flip=False)
 
         # Get eye position
-        eyetracker.eye.get_position()
+        eye.get_position()
 
         # Flip screen
         win.flip()
@@ -127,22 +137,24 @@ for trialID in range(5):
 
     # Test fixation validation
     fix = False
-    radiusCircle = visual.Circle(win, units='pix', pos=center, radius=checking.radius, fillColor=None)
-    while not fix and not stop_exp():
+    radiusCircle.radius = checking.radius  # updated by the fixation test
+    while not fix and not stopexp:
+        eye = eyetracker.eye
+
         # Draw radius
         radiusCircle.draw()
 
         # Draw target
-        eyetracker.display.gui.draw_fixation(center[0], center[1], flip=False)
+        gui.draw_fixation(center[0], center[1], flip=False)
 
         # Check fixation
-        eyetracker.eye.get_position()
+        eye.get_position()
 
         # Draw eye position
-        eyetracker.eye.draw(flip=False)
+        eye.draw(flip=False)
 
         # Test fixation
-        fix = eyetracker.eye.validate(position=[0.5*resolution[0], 0.5*resolution[1]], radius=radius_px, duration=0.200)
+        fix = eye.validate(position=screen_center, radius=radius_px, duration=0.200)
 
         # Flip screen
         win.flip()
@@ -158,20 +170,20 @@ for trialID in range(5):
     # Start trial
     # Here, we simply draw a black dot at the current gaze location. YAY, our first gaze-contingent experiment!
     trialDuration = 5
-    initTime = time.time()
-    while time.time() < initTime + trialDuration and not stopexp:
-        # Get eye position
-        eyetracker.eye.get_position()
-        eyeposition = (eyetracker.eye.x, eyetracker.eye.y)
-
-        # Print eye position
-        print(eyetracker.eye)
-
+    samples = []  # Gaze samples (time, x, y): kept in memory and only reported at the end of the trial
+    deadline = default_timer() + trialDuration  # High-resolution clock (time.time() can be coarse on Windows)
+    eye = eyetracker.eye
+    eye.get_position()
+    while default_timer() < deadline and not stopexp:
         # Draw eye-position
-        eyetracker.eye.draw(flip=False)
+        eye.draw(flip=False)
+
+        # Get eye position right after the screen has been refreshed (used for the next frame)
+        win.callOnFlip(eye.get_position)
 
         # Flip screen
         win.flip()
+        samples.append((default_timer(), eye.x, eye.y))
 
         stopexp = stop_exp()
         if stopexp:
@@ -179,6 +191,9 @@ for trialID in range(5):
 
     # End the trial (stop recording)
     eyetracker.stop_trial(trial_id=trialID+1)
+    print('Trial {}: {} gaze samples'.format(trialID+1, len(samples)))
+    if samples:
+        print('Last gaze position: x:{1:.1f} y:{2:.1f}'.format(*samples[-1]))
 
 # Close connection to eyelink
 eyetracker.close()
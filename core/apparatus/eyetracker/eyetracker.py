@@ -47,6 +47,7 @@ import math
 import random
 import logging
 import numpy as np
+from collections import deque
 
 __version__ = '1.4.1'
 
@@ -789,8 +790,8 @@ class Eye(object):
         Get eye samples for the recorded eye
         :param sample_type:
         """
-        if self.id is not 'MOUSE':
-            if sample_type is 'newest':
+        if self.id != 'MOUSE':
+            if sample_type == 'newest':
                 dt = self.tracker.el.getNewestSample()  # check for new sample update
             else:
                 dt = self.tracker.el.getNextData()  # Get oldest sample
@@ -887,10 +888,10 @@ class PositionTracker(object):
     __velocity_threshold = 0.001
 
     def __init__(self):
-        self.__history = []
+        self.__history = deque(maxlen=self.__max_positions)  # Last positions (oldest are dropped automatically)
         self.__previous = []
         self.__position = []
-        self.__intervals = []
+        self.__intervals = deque(maxlen=self.__max_positions)  # Time elapsed before each position was added
         self.__dt = 0.0
         self.__tOld = None
         self.__nb_positions = 0
@@ -917,25 +918,11 @@ class PositionTracker(object):
         Add new position to sensor's position history in order to compute statistics
         :return:
         """
-        if self.dt >= self.__time_interval:
-
-            if self.__nb_positions == 0:
-                self.__history = np.array(position)
-                self.__intervals = np.array(self.dt)
-            else:
-                if self.__nb_positions < self.__max_positions:
-                    old = self.__history
-                    self.__history = np.vstack((old, position))
-
-                    old_dts = self.__intervals
-                    self.__intervals = np.vstack((old_dts, self.dt))
-                else:
-                    old = self.__history[range(1, self.__max_positions)]
-                    self.__history = np.vstack((old, position))
-
-                    old_dts = self.__intervals[range(1, self.__max_positions)]
-                    self.__intervals = np.vstack((old_dts, self.dt))
-
+        dt = self.dt
+        if dt >= self.__time_interval:
+            # Fixed-size ring buffers: no array reallocation for every new position
+            self.__history.append(position)
+            self.__intervals.append(dt)
             self.__nb_positions += 1
 
             # Reset timer
@@ -950,12 +937,11 @@ class PositionTracker(object):
         :rtype: float
         """
         if self.__nb_positions >= self.__max_positions:
-            distances = [self.distance(self.__history[i], self.__history[j]) for i, j
-                         in zip(range(0, self.__max_positions - 1), range(1, self.__max_positions))]
-            try:
-                return float(np.mean(np.array(distances) / np.array(self.__intervals)))
-            except ZeroDivisionError:
-                return 0.0
+            # Distance covered between consecutive positions, divided by the time elapsed between them
+            distances = np.linalg.norm(np.diff(np.array(self.__history, dtype=float), axis=0), axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                velocity = np.mean(distances / np.array(self.__intervals, dtype=float)[1:])
+            return float(velocity) if np.isfinite(velocity) else 0.0
         else:
             return 0.0
 
@@ -970,14 +956,14 @@ class PositionTracker(object):
     @staticmethod
     def distance(init, end):
         """
-        Compute spherical distance between two given position
+        Compute euclidean distance between two given positions
         :param init:
-        :type init: float
+        :type init: ndarray
         :param end:
-        :type end: float
+        :type end: ndarray
         :return:
         """
-        return math.sqrt((end - init)**2)
+        return float(np.linalg.norm(np.asarray(end, dtype=float) - np.asarray(init, dtype=float)))
 
 
 class Display(object):
@@ -1196,13 +1182,13 @@ class Calibration(object):
         nb_samples = len(x)
 
         # Generates sequence list
-        sequence_index = ','.join(['{}'.format(i) for i in range(0, nb_samples+1)])
+        sequence_index = ','.join(map(str, range(0, nb_samples+1)))
 
         # Generates calibration targets list
-        calibration_targets = ' '.join(['{0:d},{1:d}'.format(int(x[i]), int(y[i])) for i in range(len(x))])
+        calibration_targets = ' '.join('{0:d},{1:d}'.format(int(x_i), int(y_i)) for x_i, y_i in zip(x, y))
 
-        # Generates validation targets list
-        validation_targets = ' '.join(['{0:d},{1:d}'.format(int(x[i]), int(y[i])) for i in range(len(x))])
+        # Validation targets are the same as calibration targets
+        validation_targets = calibration_targets
 
         logging.getLogger('EasyExp').info('[{}] ### Using custom calibration ###'.format(__name__))
         logging.getLogger('EasyExp').info('[{0}] Sequence index: {1}'.format(__name__, sequence_index))
@@ -1350,11 +1336,14 @@ class Calibration(object):
                 x += 0.5 * self.display.resolution[0]  # Center coordinates on screen center
                 y += 0.5 * self.display.resolution[1]
         elif shape == 'sphere':
-            x, y = self.pol2cart(0.5 * (self.display.resolution[0] / 2), np.linspace(0, 7 * np.pi / 4, n-1))
-            x += 0.5 * self.display.resolution[0]  # Center coordinates on screen center
-            y += 0.5 * self.display.resolution[1]
-            x = np.insert(x, 0, 0.5 * self.display.resolution[0])
-            y = np.insert(y, 0, 0.5 * self.display.resolution[1])
+            # First target at screen center, followed by the targets on the circle (computed in place)
+            phi = np.linspace(0, 7 * np.pi / 4, n-1)
+            coords = np.zeros((2, n))
+            np.cos(phi, out=coords[0, 1:])
+            np.sin(phi, out=coords[1, 1:])
+            coords *= 0.5 * (self.display.resolution[0] / 2)
+            coords += np.reshape(self.display.center, (2, 1))  # Center coordinates on screen center
+            x, y = coords
         else:
             raise AttributeError('Unknown calibration shape: "{}". Possible options are "rect" or "sphere"'.format(
                 shape))
@@ -1515,12 +1504,11 @@ class Checking(object):
         :param cy vertical position of area center
         :return bool fix
         """
-        fix = []
         mx, my, status = self.tracker.eye.get_position('newest')
-        fix.append(self.inrange(mx, my, cx, cy))
+        fix = self.inrange(mx, my, cx, cy)
 
         # Check if we need to redo a calibration
-        if True not in fix:
+        if not fix:
             self.time_lastcal = self.tracker.calibration.last
             if self.time_lastcal > self.timebtwcal:
                 self.lost = 0
@@ -1531,7 +1519,7 @@ class Checking(object):
                 self.tracker.start_recording(self.tracker.trial)
                 return
 
-        return True in fix
+        return fix
 
     def inrange(self, mx, my, cx, cy):
         """
@@ -1539,8 +1527,10 @@ class Checking(object):
         :param: mx, my: coordinates of the eye or mouse
         :param: cx, cy: coordinates of the reference point
         """
-        r = math.sqrt((mx - cx) ** 2 + (my - cy) ** 2)
-        return r <= self.radius
+        # Squared distances are compared (no square root on every sample)
+        x_diff = mx - cx
+        y_diff = my - cy
+        return x_diff * x_diff + y_diff * y_diff <= self.radius * self.radius
 
     def checkforcalibration(self):
         """
@@ -1630,9 +1620,10 @@ class FixationChecker(object):
         :param radius:
         :return:
         """
-        ref_position = np.array((x, y))
-        distance = FixationChecker.distance(ref_position, self.__tracker.eye.position)
-        return distance <= radius
+        # Squared distances are compared: no square root nor temporary arrays on every sample
+        x_diff = self.__tracker.eye.x - x
+        y_diff = self.__tracker.eye.y - y
+        return x_diff * x_diff + y_diff * y_diff <= radius * radius
 
     @staticmethod
     def distance(start, end):
@@ -21,6 +21,10 @@
 import math
 import numpy as np
 
+# Angle conversion factors
+DEG2RAD = math.pi / 180.0
+RAD2DEG = 180.0 / math.pi
+
 
 def deg2pix(size, height, distance, resolution):
     """
@@ -44,7 +48,7 @@ def deg2rad(angle):
 
     :return: converted angle in radians
     """
-    return float(angle*(math.pi/180))
+    return float(angle * DEG2RAD)
 
 
 def rad2deg(angle):
@@ -55,7 +59,7 @@ def rad2deg(angle):
 
     :return: converted angle in degrees
     """
-    return float(angle/(math.pi/180))
+    return float(angle * RAD2DEG)
 
 
 def el2Screen(pos, displaySize, sizeX, toEl=False):
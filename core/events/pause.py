@@ -58,8 +58,9 @@ class Pause(object):
         Is it time to do a break?
         :return:
         """
-        self.text = self.__handler.text
         if force or self.__handler.status:
+            # Pause message is only built when a break is actually requested
+            self.text = self.__handler.text
             self.__handler.reset()
             return True
         else:
@@ -111,6 +112,7 @@ class PauseTimer(BasePauseHandler):
         """
         self.__interval = interval
         self.__counter = None
+        self.__next_pause = None  # Time at which next break is due
 
     @property
     def elapsed(self):
@@ -131,9 +133,10 @@ class PauseTimer(BasePauseHandler):
         """
         if self.__counter is None:
             self.__counter = time.time()
+            self.__next_pause = self.__counter + self.__interval
             return False
         else:
-            return self.elapsed >= self.__interval
+            return time.time() >= self.__next_pause
 
     @property
     def text(self):
@@ -145,6 +148,7 @@ class PauseTimer(BasePauseHandler):
         :return:
         """
         self.__counter = None
+        self.__next_pause = None
 
 
 class PauseCounter(BasePauseHandler):
@@ -26,6 +26,20 @@ This file is for Timer class
 
 __version__ = '1.0.0'
 
+try:
+    # Python 3.7+
+    from time import perf_counter_ns as clock_ns
+except ImportError:
+    from timeit import default_timer
+
+    def clock_ns():
+        """
+        Highest-resolution clock available on this platform (fallback for time.perf_counter_ns())
+        :return: time in nanoseconds
+        :rtype: int
+        """
+        return int(default_timer() * 1e9)
+
 
 class Timer(object):
     """
@@ -24,6 +24,10 @@ import numpy as np
 
 __version__ = "1.1.0"
 
+# Angle conversion factors
+DEG2RAD = math.pi / 180.0
+RAD2DEG = 180.0 / math.pi
+
 
 def deg2pix_old(angle=float, direction=1, distance=550, screen_res=(800, 600), screen_size=(400, 300)):
 
@@ -42,12 +46,13 @@ def deg2pix_old(angle=float, direction=1, distance=550, screen_res=(800, 600), s
      :rtype: tuple (int, int)
     """
 
-    widthscr, heightscr = [float(i) for i in screen_res]
-    widthres, heightres = [float(i) for i in screen_size]
+    widthscr, heightscr = float(screen_res[0]), float(screen_res[1])
+    widthres, heightres = float(screen_size[0]), float(screen_size[1])
 
     if direction == 1:
-        wdth = round(math.tan(deg2rad(angle/2))*2*distance*(widthres/widthscr))
-        hght = round(math.tan(deg2rad(angle/2))*2*distance*(heightres/heightscr))
+        span = math.tan(angle * DEG2RAD / 2) * 2 * distance  # Size of the angle on the screen (computed once)
+        wdth = round(span*(widthres/widthscr))
+        hght = round(span*(heightres/heightscr))
     else:
         wdth = rad2deg(math.atan(((angle/2)/(distance*(widthres/widthscr)))))*2
         hght = rad2deg(math.atan(((angle/2)/(distance*(heightres/heightscr)))))*2
@@ -62,7 +67,7 @@ def deg2rad(angle):
     :return: converted angle in radians
     :rtype: float
     """
-    return angle*(math.pi/180)
+    return angle * DEG2RAD
 
 
 def rad2deg(angle):
@@ -72,7 +77,7 @@ def rad2deg(angle):
     :return: converted angle in degrees
     :rtype: float
     """
-    return float(angle/(math.pi/180))
+    return float(angle * RAD2DEG)
 
 
 def cart2pol(x, y):
@@ -83,7 +88,7 @@ def cart2pol(x, y):
     :return: rho, theta
     :rtype: list (float, float)
     """
-    rho = math.sqrt(x**2 + y**2)
+    rho = math.hypot(x, y)  # no overflow/underflow of the intermediate squares
     theta = math.atan2(y, x)
     return rho, theta
 
@@ -67,6 +67,22 @@ class QueueHandler(logging.Handler):
         logging.Handler.__init__(self)
         self.queue = queue
 
+    def prepare(self, record):
+        """
+        Prepare a record for queuing.
+
+        Merges the message with its arguments and drops the fields that are not needed anymore (arguments, traceback
+        object), so that only a small record has to be pickled and sent to the listener.
+        """
+        if record.exc_info:
+            self.format(record)  # just to get traceback text into record.exc_text
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        if hasattr(record, 'stack_info'):
+            record.stack_info = None
+        return record
+
     def emit(self, record):
         """
         Emit a record.
@@ -74,11 +90,7 @@ class QueueHandler(logging.Handler):
         Writes the LogRecord to the queue.
         """
         try:
-            ei = record.exc_info
-            if ei:
-                dummy = self.format(record)  # just to get traceback text into record.exc_text
-                record.exc_info = None  # not needed any more
-            self.queue.put_nowait(record)
+            self.queue.put_nowait(self.prepare(record))
         except (KeyboardInterrupt, SystemExit):
             raise
         except:
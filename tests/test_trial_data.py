@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Tests of Trial's data file and design file I/O
+
+# Import libraries
+from os.path import dirname, abspath, join
+import sys
+import atexit
+import csv
+import shutil
+import tempfile
+import weakref
+
+# Sessions' files (registered before importing Trial so that they are removed after Trial's exit handler has written
+# pending design updates)
+sessions_folder = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, sessions_folder, True)
+
+# Environmental settings
+root_folder = dirname(dirname(abspath(__file__)))
+sys.path.append(root_folder)
+from core.Design import Design
+from core.Trial import Trial
+
+# Experiment's conditions and matching design file's header
+conditions = {'timing': [0.1, 0.2], 'method': 'Constant', 'options': {}}
+headers = ['TrialID', 'Replay', 'timing']
+
+
+def make_design_file(folder, ntrials=4):
+    """
+    Write a design file where every trial still has to be played
+    :param folder: path to session folder
+    :param ntrials: number of trials
+    :return: path to design file
+    """
+    designfile = join(folder, 'design.csv')
+    with open(designfile, 'wb') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(headers)
+        for t in range(ntrials):
+            writer.writerow([t + 1, True, conditions['timing'][t % 2]])
+    return designfile
+
+
+def read_design_file(designfile):
+    """
+    Read design file
+    :return: Replay status of every trial {TrialID: Replay}
+    :rtype: dict
+    """
+    with open(designfile, 'rb') as csvfile:
+        return {row['TrialID']: row['Replay'] for row in csv.DictReader(csvfile)}
+
+
+def new_trial(folder, flush_interval=10):
+    """
+    Start a (new or resumed) session from the files stored in folder
+    :param folder: path to session folder
+    :param flush_interval: number of trial updates between two writes of the design file
+    :rtype: Trial
+    """
+    settings = {'setup': {'pauseDur': 0, 'pauseMode': 'time', 'pauseInt': 3600,
+                          'design_flush_interval': flush_interval}}
+    design = Design(userfile=join(folder, 'design.csv'), conditions=dict(conditions))
+
+    # Normally set by Design.make()
+    design.headers = list(headers)
+    design.ntrials = len(read_design_file(design.userfile))
+
+    return Trial(design=design, settings=settings, userfile=join(folder, 'data.csv'))
+
+
+def play(trial, ntrials, valid=True):
+    """
+    Play trials and write their data
+    :param trial: instance of Trial
+    :param ntrials: number of trials to play
+    :param valid: trial's outcome
+    :return: IDs of played trials
+    :rtype: list
+    """
+    played = []
+    for t in range(ntrials):
+        trial.setup()
+        assert trial.status is True
+        played.append(trial.id)
+        trial.stop(valid)
+        trial.write_data({'intensity': 0, 'correct': 'left'})
+    return played
+
+
+def test_reload_partial_session():
+    """
+    A session interrupted after a few trials must resume with the remaining trials and keep the data file's header
+    """
+    folder = tempfile.mkdtemp(dir=sessions_folder)
+    make_design_file(folder)
+    trial = new_trial(folder)
+    played = play(trial, 2)
+    trial.save_design()
+    trial.close()
+
+    # Resume session
+    trial = new_trial(folder)
+    data = trial.load_data()
+    assert [int(row['TrialID']) for row in data] == played
+    assert trial.nplayed == 0
+
+    remaining = play(trial, 2)
+    assert sorted(played + remaining) == [1, 2, 3, 4]
+    assert trial.nplayed == 4
+
+    trial.setup()
+    assert trial.status is False
+
+    # Only the rows appended since last load are parsed, header is written only once
+    data = trial.load_data()
+    assert [int(row['TrialID']) for row in data] == played + remaining
+    assert all(row['Replay'] == 'False' and row['correct'] == 'left' for row in data)
+    with open(join(folder, 'data.csv'), 'rb') as csvfile:
+        header = next(csv.reader(csvfile))
+    assert header == ['TrialID', 'Replay', 'timing', 'correct', 'intensity']
+    trial.close()
+
+
+def test_unknown_field():
+    """
+    Writing a field that is not in the data file's header must raise a ValueError (also after reloading the header)
+    """
+    folder = tempfile.mkdtemp(dir=sessions_folder)
+    make_design_file(folder)
+    trial = new_trial(folder)
+    play(trial, 1)
+    trial.close()
+
+    for trial in (trial, new_trial(folder)):
+        trial.setup()
+        trial.stop(True)
+        try:
+            trial.write_data({'intensity': 0, 'correct': 'left', 'confidence': 3})
+        except ValueError as e:
+            assert 'confidence' in str(e)
+        else:
+            raise AssertionError('Unknown field has been written into the data file')
+        trial.close()
+
+
+def test_design_batching():
+    """
+    Design file must only be written every `design_flush_interval` trial updates
+    """
+    folder = tempfile.mkdtemp(dir=sessions_folder)
+    designfile = make_design_file(folder)
+    trial = new_trial(folder, flush_interval=2)
+    first = play(trial, 1)
+    assert read_design_file(designfile)[str(first[0])] == 'True'
+
+    second = play(trial, 1)
+    status = read_design_file(designfile)
+    assert status[str(first[0])] == 'False' and status[str(second[0])] == 'False'
+    trial.close()
+
+
+def test_exit_flushes_latest_trial():
+    """
+    Exit handler must only write pending design updates of the latest trial, without keeping older trials alive
+    """
+    folder = tempfile.mkdtemp(dir=sessions_folder)
+    designfile = make_design_file(folder)
+    trial = new_trial(folder)
+    played = play(trial, 1)
+    older = weakref.ref(trial)
+    del trial
+    assert older() is None
+
+    trial = new_trial(folder)
+    assert read_design_file(designfile)[str(played[0])] == 'True'
+    played = play(trial, 1)
+    Trial.flush_current()
+    assert read_design_file(designfile)[str(played[0])] == 'False'
+
+
+def test_quit_flushes_design():
+    """
+    BaseTrial.quit() must write design updates that have not been flushed yet
+    """
+    from core.BaseTrial import BaseTrial
+
+    class Devices(object):
+        def close_all(self):
+            pass
+
+    class Experiment(BaseTrial):
+        def __init__(self, trial):
+            self.trial = trial
+            self.devices = Devices()
+            self.threads = {}
+
+    folder = tempfile.mkdtemp(dir=sessions_folder)
+    designfile = make_design_file(folder)
+    trial = new_trial(folder)
+    played = play(trial, 2, valid=False) + play(trial, 1)
+    assert set(read_design_file(designfile).values()) == {'True'}
+
+    Experiment(trial).quit()
+    status = read_design_file(designfile)
+    assert status[str(played[0])] == 'replay' and status[str(played[1])] == 'replay'
+    assert status[str(played[2])] == 'False'
+
+
+def main():
+    """
+    Run all tests
+    """
+    for test in (test_reload_partial_session, test_unknown_field, test_design_batching, test_exit_flushes_latest_trial,
+                 test_quit_flushes_design):
+        test()
+        print('{}: OK'.format(test.__name__))
+
+
+if __name__ == '__main__':
+    main()